@@ -1,21 +1,49 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response, send_from_directory
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
+from werkzeug.wsgi import get_input_stream
 from datetime import datetime
 import json
+import logging
 import os
-from predict import predict_risk
-from models import Report, User, SafetyZone
+import time
+from predict import predict_risk, predictor
+from auth import token_required
+from config import Config
+from uploads import UploadManager, UploadError
+from caching import data_versions, conditional_json
+from changefeed import change_feed
+from bulk_import import import_reports
+from clustering import clusterer
+from export import ExportFilter, ExportError, FORMATS, memory_pages, stream_export
+from metrics import (registry, profiler, http_request_duration, socket_clients,
+                     socket_emit_fanout, socket_emit_duration, store_size)
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Load the model without blocking startup (see Config.MODEL_LOAD_MODE)
+if Config.MODEL_LOAD_MODE == 'eager':
+    predictor.ensure_loaded()
+elif Config.MODEL_LOAD_MODE == 'background':
+    predictor.warm_up()
+
 # In-memory storage (use MongoDB in production)
 reports = []
 users = []
 heatmap_data = []
 
+logger = logging.getLogger(__name__)
+
+# Store sizes are read at scrape time, so they cost nothing per request
+store_size.labels('reports').set_function(lambda: len(reports))
+store_size.labels('users').set_function(lambda: len(users))
+store_size.labels('heatmap_data').set_function(lambda: len(heatmap_data))
+store_size.labels('incidents').set_function(lambda: len(clusterer.incidents))
+store_size.labels('upload_sessions').set_function(lambda: len(upload_manager.sessions))
+
 # Emergency contacts
 EMERGENCY_CONTACTS = {
     "police": "100",
@@ -24,6 +52,33 @@ EMERGENCY_CONTACTS = {
     "national_emergency": "112"
 }
 
+@app.before_request
+def start_request_timer():
+    if registry.enabled:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Label by route template (not raw path) to keep cardinality bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_duration.labels(
+            request.method, route, response.status_code
+        ).observe(time.perf_counter() - start)
+    return response
+
+def broadcast(event, data):
+    """Emit an event to all connected clients, recording fan-out metrics"""
+    if not registry.enabled:
+        socketio.emit(event, data)
+        return
+    
+    start = time.perf_counter()
+    socketio.emit(event, data)
+    socket_emit_duration.labels(event).observe(time.perf_counter() - start)
+    socket_emit_fanout.labels(event).observe(socket_clients.labels().value)
+
 @app.route('/')
 def home():
     return jsonify({
@@ -33,10 +88,23 @@ def home():
             "report_incident": "/api/report",
             "get_heatmap": "/api/heatmap",
             "predict_risk": "/api/predict",
-            "emergency": "/api/emergency"
+            "emergency": "/api/emergency",
+            "metrics": "/metrics",
+            "ready": "/api/ready"
         }
     })
 
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """
+    Readiness probe: 503 until the prediction model is loaded. In lazy
+    mode the model loads on the first prediction, which can't arrive
+    until the pod is ready, so it reports ready straight away.
+    """
+    status = predictor.status()
+    status["ready"] = status["model_loaded"] or Config.MODEL_LOAD_MODE == 'lazy'
+    return jsonify(status), 200 if status["ready"] else 503
+
 @app.route('/api/report', methods=['POST'])
 def report_incident():
     """Submit a safety incident report"""
@@ -54,13 +122,16 @@ def report_incident():
             "verified": False,
             "upvotes": 0,
             "downvotes": 0,
+            "media_urls": [],
             "status": "pending"
         }
         
         reports.append(report)
+        created = cluster_reports([report])
         
-        # Broadcast to all connected clients
-        socketio.emit('new_report', report)
+        # Broadcast new incidents only; duplicates update the existing one
+        if created:
+            broadcast('new_report', report)
         
         # Update heatmap
         update_heatmap(report)
@@ -68,7 +139,8 @@ def report_incident():
         return jsonify({
             "success": True,
             "message": "Report submitted successfully",
-            "report_id": report["id"]
+            "report_id": report["id"],
+            "incident_id": report["incident_id"]
         })
         
     except Exception as e:
@@ -77,41 +149,128 @@ def report_incident():
             "error": str(e)
         }), 400
 
-@app.route('/api/heatmap', methods=['GET'])
-def get_heatmap():
-    """Get safety heatmap data"""
+# Reports within this many degrees of the query point are included
+HEATMAP_DELTA = 0.1
+
+def heatmap_params():
     lat = request.args.get('lat', default=28.6139, type=float)  # Default: Delhi
     lng = request.args.get('lng', default=77.2090, type=float)
     radius = request.args.get('radius', default=5, type=float)  # 5km radius
+    since = request.args.get('since')  # Cursor from a previous response
+    # Sync clients (sending ?sync=true or a cursor) get every point and a cursor
+    sync = since is not None or request.args.get('sync', 'false').lower() in ('1', 'true')
+    return lat, lng, radius, since, sync
+
+def heatmap_etag():
+    lat, lng, radius, since, sync = heatmap_params()
+    version, _ = data_versions.region(lat, lng, HEATMAP_DELTA)
+    return data_versions.etag(version, 'heatmap', lat, lng, radius, since, sync)
+
+def heatmap_point(incident):
+    """Heatmap representation of an incident"""
+    return {
+        "id": incident['id'],
+        "lat": incident['latitude'],
+        "lng": incident['longitude'],
+        "weight": incident['severity'] * 10,
+        "type": incident['incident_type'],
+        "reports": incident['report_count']
+    }
+
+@app.route('/api/reports/bulk', methods=['POST'])
+def bulk_import_reports():
+    """
+    Import reports from an NDJSON (default) or CSV body.
+    Rows use the same fields as /api/report. Invalid rows are skipped
+    and reported by line number; one summary event is broadcast.
+    """
+    content_type = request.mimetype or ''
+    fmt = request.args.get('format') or ('csv' if 'csv' in content_type else 'ndjson')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"success": False, "error": "Unsupported format"}), 400
+    
+    # Backfills of historical data re-cluster once at the end instead of per row
+    backfill = request.args.get('recluster', 'false').lower() in ('1', 'true')
     
-    # Filter reports within radius
-    nearby_reports = []
-    for report in reports:
+    # Bypass the app-wide MAX_CONTENT_LENGTH, which is sized for uploads
+    stream = get_input_stream(request.environ, max_content_length=Config.MAX_BULK_IMPORT_SIZE)
+    summary = import_reports(
+        stream, fmt, lambda batch: insert_reports(batch, cluster=not backfill),
+        default_user_id=request.args.get('user_id', 'bulk-import')
+    )
+    if backfill:
+        summary["incidents"] = recluster_incidents()
+    
+    broadcast('bulk_import', {
+        "imported": summary["imported"],
+        "rejected": summary["rejected"]
+    })
+    
+    summary["success"] = True
+    return jsonify(summary)
+
+@app.route('/api/heatmap', methods=['GET'])
+@conditional_json(heatmap_etag)
+def get_heatmap():
+    """
+    Get safety heatmap data.
+    With ?since=<cursor> only the points added, updated or removed since
+    that cursor are returned. A cursor is only valid for the lat/lng/radius
+    it was issued for; otherwise, or if it is too old, a full response is
+    sent instead. Clients start syncing with ?sync=true, which returns the
+    full, uncapped set of points and a cursor. Without it the response is
+    capped at HEATMAP_MAX_POINTS and, if truncated, has no cursor, since
+    deltas can't be applied to an incomplete set.
+    """
+    lat, lng, radius, since, sync = heatmap_params()
+    version, last_updated = data_versions.region(lat, lng, HEATMAP_DELTA)
+    
+    if since is not None:
+        since_seq = change_feed.parse_cursor(since, lat, lng, radius)
+        changes = None
+        if since_seq is not None:
+            changes = change_feed.changes_since(lat, lng, HEATMAP_DELTA, since_seq)
+        
+        if changes is not None:
+            added, updated, removed = changes
+            return {
+                "center": {"lat": lat, "lng": lng},
+                "radius_km": radius,
+                "full": False,
+                "cursor": change_feed.cursor(version, lat, lng, radius),
+                "added": added,
+                "updated": updated,
+                "removed": removed,
+                "last_updated": last_updated
+            }
+    
+    # Filter incidents within radius
+    nearby_incidents = []
+    for incident in list(clusterer.incidents.values()):
         # Simple distance calculation (use geopy in production)
-        if abs(report['latitude'] - lat) < 0.1 and abs(report['longitude'] - lng) < 0.1:
-            nearby_reports.append(report)
-    
-    # Generate heatmap points
-    heatmap_points = []
-    for report in nearby_reports[:50]:  # Limit points
-        heatmap_points.append({
-            "lat": report['latitude'],
-            "lng": report['longitude'],
-            "weight": report['severity'] * 10,
-            "type": report['incident_type']
-        })
+        if abs(incident['latitude'] - lat) < HEATMAP_DELTA and abs(incident['longitude'] - lng) < HEATMAP_DELTA:
+            nearby_incidents.append(incident)
     
-    # Calculate safety score (1-100)
-    safety_score = calculate_safety_score(nearby_reports)
+    # Generate heatmap points; only one-off views are capped
+    limit = None if sync else Config.HEATMAP_MAX_POINTS
+    heatmap_points = [heatmap_point(incident) for incident in nearby_incidents[:limit]]
+    truncated = len(heatmap_points) < len(nearby_incidents)
     
-    return jsonify({
+    # Calculate safety score (1-100) per incident, not per duplicate report
+    safety_score = calculate_safety_score(nearby_incidents)
+    
+    return {
         "center": {"lat": lat, "lng": lng},
         "radius_km": radius,
         "heatmap_data": heatmap_points,
         "safety_score": safety_score,
-        "total_reports": len(nearby_reports),
-        "last_updated": datetime.now().isoformat()
-    })
+        "total_reports": sum(incident['report_count'] for incident in nearby_incidents),
+        "total_incidents": len(nearby_incidents),
+        "full": True,
+        "truncated": truncated,
+        "cursor": None if truncated else change_feed.cursor(version, lat, lng, radius),
+        "last_updated": last_updated
+    }
 
 @app.route('/api/predict', methods=['POST'])
 def predict_safety():
@@ -159,7 +318,7 @@ def emergency_sos():
     }
     
     # Broadcast emergency
-    socketio.emit('emergency_alert', emergency_data)
+    broadcast('emergency_alert', emergency_data)
     
     return jsonify({
         "success": True,
@@ -167,10 +326,59 @@ def emergency_sos():
         "contacts_notified": emergency_data["emergency_contacts_notified"]
     })
 
+# Contacts are static, so their version never changes
+CONTACTS_ETAG = data_versions.etag(0, 'contacts', sorted(EMERGENCY_CONTACTS.items()))
+
 @app.route('/api/emergency/contacts', methods=['GET'])
+@conditional_json(lambda: CONTACTS_ETAG)
 def get_emergency_contacts():
     """Get emergency contact numbers"""
-    return jsonify(EMERGENCY_CONTACTS)
+    return EMERGENCY_CONTACTS
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose metrics in Prometheus text format"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiler', methods=['GET', 'POST'])
+@token_required
+def sampling_profiler(user_id):
+    """
+    Toggle the sampling profiler at runtime (requires PROFILER_ENABLED
+    and a valid token).
+    POST {"action": "start" | "stop" | "reset", "interval": 0.01}
+    GET returns the collected stacks in folded format.
+    """
+    if not Config.PROFILER_ENABLED:
+        return jsonify({"success": False, "error": "Profiler is disabled"}), 404
+    
+    if request.method == 'GET':
+        limit = request.args.get('limit', default=None, type=int)
+        return Response(profiler.report(limit), mimetype='text/plain')
+    
+    data = request.json or {}
+    action = data.get('action')
+    
+    if action == 'start':
+        try:
+            changed = profiler.start(data.get('interval'))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+    elif action == 'stop':
+        changed = profiler.stop()
+    elif action == 'reset':
+        profiler.reset()
+        changed = True
+    else:
+        return jsonify({"success": False, "error": "Unknown action"}), 400
+    
+    return jsonify({
+        "success": True,
+        "changed": changed,
+        "running": profiler.running,
+        "interval": profiler.interval,
+        "samples": profiler.samples
+    })
 
 @app.route('/api/reports/verify', methods=['POST'])
 def verify_report():
@@ -192,6 +400,10 @@ def verify_report():
         if report['upvotes'] >= 5 and report['upvotes'] > report['downvotes'] * 2:
             report['verified'] = True
         
+        incident = clusterer.vote(report, action)
+        if incident:
+            change_feed.record('update', heatmap_point(incident))
+        
         return jsonify({
             "success": True,
             "upvotes": report['upvotes'],
@@ -201,6 +413,100 @@ def verify_report():
     
     return jsonify({"success": False, "error": "Report not found"}), 404
 
+@app.route('/api/reports/export', methods=['GET'])
+@token_required
+def export_reports(user_id):
+    """
+    Stream reports as NDJSON (default), Arrow IPC or Parquet.
+    Filters: bbox=min_lng,min_lat,max_lng,max_lat, start, end (ISO), type
+    Requires a valid token: exports include user ids and descriptions.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    try:
+        export_filter = ExportFilter.from_args(
+            request.args.get('bbox'),
+            request.args.get('start'),
+            request.args.get('end'),
+            request.args.get('type')
+        )
+        # Yield to the event loop between pages so live traffic isn't stalled
+        chunks = stream_export(memory_pages(reports, export_filter), fmt, pause=socketio.sleep)
+    except ExportError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    return Response(chunks, mimetype=FORMATS[fmt], headers={
+        "Content-Disposition": f"attachment; filename=reports.{fmt}"
+    })
+
+@app.route('/api/incidents/recluster', methods=['POST'])
+@token_required
+def recluster(user_id):
+    """
+    Rebuild all incidents from the stored reports (after backfills).
+    Requires a valid token: every client has to resync afterwards.
+    """
+    return jsonify({
+        "success": True,
+        "incidents": recluster_incidents()
+    })
+
+@app.route('/api/reports/<int:report_id>/media', methods=['POST'])
+def create_media_upload(report_id):
+    """
+    Start a resumable upload for a report attachment.
+    Body: {"filename": "clip.mp4", "size": 12345678}
+    """
+    report = next((r for r in reports if r["id"] == report_id), None)
+    if not report:
+        return jsonify({"success": False, "error": "Report not found"}), 404
+    
+    data = request.json or {}
+    try:
+        session = upload_manager.create(report_id, data.get('filename'), data.get('size'))
+    except UploadError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status
+    
+    response = session.to_dict()
+    response.update({"success": True, "chunk_size": Config.UPLOAD_CHUNK_SIZE})
+    return jsonify(response), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['PATCH'])
+def upload_media_chunk(upload_id):
+    """
+    Append a chunk of raw bytes to an upload.
+    The Upload-Offset header must match the server's current offset;
+    after a failure, GET the upload to find where to resume.
+    """
+    offset = request.headers.get('Upload-Offset', type=int)
+    try:
+        # Read request.stream directly so Flask never buffers the body
+        session = upload_manager.write_chunk(
+            upload_id, offset, request.stream, request.content_length
+        )
+    except UploadError as e:
+        return jsonify({"success": False, "error": str(e), **e.extra}), e.status
+    
+    response = session.to_dict()
+    response["success"] = True
+    return jsonify(response)
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_media_upload(upload_id):
+    """Get upload progress and, once processed, the media URLs"""
+    try:
+        session = upload_manager.get(upload_id)
+    except UploadError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status
+    
+    response = session.to_dict()
+    response["success"] = True
+    return jsonify(response)
+
+@app.route('/uploads/media/<path:filename>', methods=['GET'])
+def serve_media(filename):
+    """Serve processed (metadata-stripped) media"""
+    return send_from_directory(upload_manager.media_dir, filename)
+
 @app.route('/api/navigation/safe-route', methods=['POST'])
 def get_safe_route():
     """Get safest route between two points"""
@@ -232,6 +538,82 @@ def update_heatmap(report):
         "time": datetime.now().isoformat()
     })
 
+def find_report(report_id):
+    """Look up a report by id (ids are 1-based positions in `reports`)"""
+    if 1 <= report_id <= len(reports):
+        return reports[report_id - 1]
+    return None
+
+def cluster_reports(new_reports):
+    """
+    Attach reports to incidents and log the resulting heatmap changes.
+    Returns the incidents that were newly created.
+    """
+    created_incidents = []
+    for report in sorted(new_reports, key=lambda r: r['timestamp']):
+        incident, created, merged = clusterer.add(report, find_report)
+        for absorbed in merged:
+            change_feed.record('remove', heatmap_point(absorbed))
+        change_feed.record('add' if created else 'update', heatmap_point(incident))
+        if created:
+            created_incidents.append(incident)
+    return created_incidents
+
+def recluster_incidents():
+    """Re-cluster every report from scratch; returns the incident count"""
+    old, new = clusterer.recluster(reports)
+    change_feed.record_many('remove', [heatmap_point(incident) for incident in old])
+    change_feed.record_many('add', [heatmap_point(incident) for incident in new])
+    return len(new)
+
+def insert_reports(validated, cluster=True):
+    """Bulk-insert validated Report models into the store and heatmap"""
+    next_id = len(reports) + 1
+    now = datetime.now().isoformat()
+    new_reports = [{
+        "id": next_id + i,
+        "user_id": model.user_id,
+        "latitude": model.location.latitude,
+        "longitude": model.location.longitude,
+        "incident_type": model.incident_type,
+        "severity": model.severity,
+        "description": model.description,
+        "timestamp": model.timestamp.isoformat(),
+        "verified": False,
+        "upvotes": 0,
+        "downvotes": 0,
+        "media_urls": [],
+        "status": "pending"
+    } for i, model in enumerate(validated)]
+    
+    reports.extend(new_reports)
+    heatmap_data.extend({
+        "lat": report['latitude'],
+        "lng": report['longitude'],
+        "intensity": report['severity'] * 20,
+        "time": now
+    } for report in new_reports)
+    
+    if cluster:
+        cluster_reports(new_reports)
+
+def attach_media(session):
+    """Attach processed media URLs to their report once processing finishes"""
+    report = next((r for r in reports if r["id"] == session.report_id), None)
+    if not report:
+        return
+    
+    media_urls = report.setdefault('media_urls', [])
+    media_urls.extend(url for url in session.media_urls if url not in media_urls)
+    
+    broadcast('report_media', {
+        "report_id": report["id"],
+        "media_urls": media_urls
+    })
+
+# Resolve once so writes and send_from_directory agree whatever the working directory
+upload_manager = UploadManager(os.path.join(app.root_path, Config.UPLOAD_FOLDER), on_complete=attach_media)
+
 def calculate_safety_score(reports_list):
     """Calculate safety score from 1-100"""
     if not reports_list:
@@ -258,9 +640,10 @@ def get_safety_color(score):
 def get_location_history(lat, lng):
     """Get historical incident data for location"""
     # This would query database in production
-    history = [r for r in reports 
-               if abs(r['latitude'] - lat) < 0.01 
-               and abs(r['longitude'] - lng) < 0.01]
+    # Incidents, not reports, so duplicate reports don't inflate the risk
+    history = [incident for incident in list(clusterer.incidents.values())
+               if abs(incident['latitude'] - lat) < 0.01
+               and abs(incident['longitude'] - lng) < 0.01]
     return history
 
 def generate_safe_route(start_lat, start_lng, end_lat, end_lng):
@@ -274,15 +657,14 @@ def generate_safe_route(start_lat, start_lng, end_lat, end_lng):
 
 @socketio.on('connect')
 def handle_connect():
-    print('Client connected')
+    socket_clients.inc()
+    logger.info('Client connected')
     emit('connected', {'data': 'Connected to SafeStree'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    print('Client disconnected')
-
-if __name__ == '__main__':
-    socketio.run(app, debug=True, port=5000)
+    socket_clients.dec()
+    logger.info('Client disconnected')
 
 from geocoding import geocoder
 
@@ -342,4 +724,7 @@ def forward_geocode():
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+if __name__ == '__main__':
+    socketio.run(app, debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import List
+
+from config import Config
+
+try:
+    import orjson
+    _loads = orjson.loads
+    _DecodeError = orjson.JSONDecodeError
+except ImportError:
+    _loads = json.loads
+    _DecodeError = json.JSONDecodeError
+
+_report_batch = None
+
+
+def _batch_adapter():
+    """
+    TypeAdapter that validates a whole batch in one call into pydantic's
+    compiled core. Built on first use because pydantic is slow to import.
+    """
+    global _report_batch
+    if _report_batch is None:
+        from pydantic import TypeAdapter
+        from models import Report
+        _report_batch = TypeAdapter(List[Report])
+    return _report_batch
+
+
+def _buffered(stream):
+    """
+    Werkzeug's LimitedStream is unbuffered, so iterating it line by line
+    reads one byte per call; wrap raw streams in a large read buffer.
+    """
+    if isinstance(stream, io.BufferedIOBase) or not hasattr(stream, 'readinto'):
+        return stream
+    return io.BufferedReader(stream, Config.BULK_READ_BUFFER_SIZE)
+
+
+class RowError(Exception):
+    """A row that couldn't be parsed"""
+
+
+def iter_ndjson(stream):
+    """Yield (line_number, row) from an NDJSON byte stream"""
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = _loads(line)
+        except (_DecodeError, UnicodeDecodeError) as e:
+            yield line_no, RowError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield line_no, RowError("Row must be a JSON object")
+            continue
+        yield line_no, row
+
+
+def iter_csv(stream):
+    """
+    Yield (line_number, row) from a CSV byte stream with a header row.
+    Lines are decoded one at a time so a bad byte or an oversized field
+    only rejects its own row.
+    """
+    bad_lines = set()
+
+    def lines():
+        for line_no, line in enumerate(stream, start=1):
+            try:
+                yield line.decode('utf-8')
+            except UnicodeDecodeError:
+                bad_lines.add(line_no)
+                yield line.decode('utf-8', errors='replace')
+
+    reader = csv.DictReader(lines())
+    try:
+        reader.fieldnames
+    except csv.Error as e:
+        yield 1, RowError(f"Invalid CSV header: {e}")
+        return
+    if bad_lines:
+        yield 1, RowError("Invalid UTF-8 in CSV header")
+        return
+
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            bad_lines.clear()
+            # DictReader only updates line_num after a successful read
+            yield reader.reader.line_num, RowError(f"Invalid CSV: {e}")
+            continue
+
+        # Lines are pulled lazily, so any bad line belongs to this row
+        if bad_lines:
+            bad_lines.clear()
+            yield reader.line_num, RowError("Invalid UTF-8")
+            continue
+        # Empty cells mean "not provided" so model defaults apply
+        yield reader.line_num, {k: v for k, v in row.items() if v not in ('', None)}
+
+
+def _to_model_input(row, default_user_id, now):
+    """Map an API-style row (as sent to /api/report) onto the Report model"""
+    location = row.get('location')
+    if not isinstance(location, dict):
+        location = {
+            "latitude": row.get('latitude'),
+            "longitude": row.get('longitude'),
+            "address": row.get('address')
+        }
+    return {
+        "id": 0,  # Assigned on insert
+        "user_id": str(row.get('user_id') or default_user_id),
+        "location": location,
+        "incident_type": row.get('type', row.get('incident_type', 'harassment')),
+        "severity": row.get('severity', 3),
+        "description": row.get('description', ''),
+        "timestamp": row.get('timestamp') or now
+    }
+
+
+def validate_batch(batch, default_user_id):
+    """
+    Validate a batch of (line_number, row) pairs against the Report model.
+    Returns (reports, errors) where reports is a list of (line_number, Report).
+    """
+    from pydantic import ValidationError
+
+    adapter = _batch_adapter()
+    now = datetime.now()
+    line_numbers = []
+    inputs = []
+    errors = []
+
+    for line_no, row in batch:
+        if isinstance(row, RowError):
+            errors.append({"line": line_no, "error": str(row)})
+            continue
+        line_numbers.append(line_no)
+        inputs.append(_to_model_input(row, default_user_id, now))
+
+    try:
+        return list(zip(line_numbers, adapter.validate_python(inputs))), errors
+    except ValidationError as e:
+        failed = {}
+        for error in e.errors():
+            index = error['loc'][0]
+            field = '.'.join(str(part) for part in error['loc'][1:])
+            failed.setdefault(index, []).append(f"{field}: {error['msg']}")
+
+    for index, messages in failed.items():
+        errors.append({"line": line_numbers[index], "error": '; '.join(messages)})
+
+    # Second pass over the rows that passed; they can't fail again
+    valid = [i for i in range(len(inputs)) if i not in failed]
+    reports = adapter.validate_python([inputs[i] for i in valid])
+    errors.sort(key=lambda error: error['line'])
+    return [(line_numbers[i], report) for i, report in zip(valid, reports)], errors
+
+
+def import_reports(stream, fmt, insert_batch, default_user_id='bulk-import'):
+    """
+    Stream rows from `stream`, validate them in batches and hand each
+    batch of valid reports to `insert_batch`. Memory use is bounded by
+    BULK_BATCH_SIZE and BULK_MAX_ERRORS regardless of input size.
+    """
+    stream = _buffered(stream)
+    rows = iter_csv(stream) if fmt == 'csv' else iter_ndjson(stream)
+    summary = {"imported": 0, "rejected": 0, "errors": [], "errors_truncated": False}
+
+    def flush(batch):
+        reports, errors = validate_batch(batch, default_user_id)
+        if reports:
+            insert_batch([report for _, report in reports])
+        summary["imported"] += len(reports)
+        summary["rejected"] += len(errors)
+        room = Config.BULK_MAX_ERRORS - len(summary["errors"])
+        summary["errors"].extend(errors[:max(room, 0)])
+        if len(errors) > room:
+            summary["errors_truncated"] = True
+
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= Config.BULK_BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    return summary
@@ -0,0 +1,218 @@
+import gzip
+import hashlib
+import json
+import math
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import request, Response
+
+from config import Config
+
+# Optional fast paths
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def dumps(payload):
+    """Serialize to JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+class DataVersions:
+    """
+    Data-version counters per spatial grid cell.
+
+    Every mutation takes the next value of a global sequence and stamps it
+    on the cell containing the affected point. The version of a region is
+    the highest stamp among its cells, so it changes whenever anything in
+    the region changes and never otherwise.
+    """
+
+    def __init__(self, cell_size=Config.VERSION_CELL_SIZE):
+        self.cell_size = cell_size
+        # Distinguishes processes so ETags don't collide across restarts
+        self.epoch = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self.cells = {}  # (row, col) -> (version, last_modified)
+        self.started_at = datetime.now().isoformat()
+        self._lock = threading.Lock()
+
+    def cell(self, lat, lng):
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def bump(self, lat, lng):
+        """Record a mutation at a point and return its sequence number"""
+        with self._lock:
+            self.sequence += 1
+            self.cells[self.cell(lat, lng)] = (self.sequence, datetime.now().isoformat())
+            return self.sequence
+
+    def region(self, lat, lng, delta):
+        """Return (version, last_modified) for the box lat/lng +- delta degrees"""
+        min_row, min_col = self.cell(lat - delta, lng - delta)
+        max_row, max_col = self.cell(lat + delta, lng + delta)
+
+        version, last_modified = 0, self.started_at
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                entry = self.cells.get((row, col))
+                if entry and entry[0] > version:
+                    version, last_modified = entry
+        return version, last_modified
+
+    def etag(self, version, *params):
+        """Strong validator for a versioned region and the query that shaped it"""
+        digest = hashlib.blake2b(repr(params).encode('utf-8'), digest_size=6).hexdigest()
+        return f"{self.epoch}-{version}-{digest}"
+
+
+def _negotiate_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        pieces = part.strip().split(';')
+        coding = pieces[0].strip().lower()
+        quality = 1.0
+        for param in pieces[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding] = quality
+
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=Config.GZIP_LEVEL)
+
+
+def _if_none_match(candidates):
+    """Return the first of `candidates` the request's If-None-Match covers, or None"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return None
+    held = set()
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return candidates[0]
+        # Weak comparison, as If-None-Match requires
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        held.add(tag.strip('"'))
+    for candidate in candidates:
+        if candidate in held:
+            return candidate
+    return None
+
+
+def _variant_tag(base_tag, encoding):
+    """Compressed variants carry an encoding suffix"""
+    return f"{base_tag}-{encoding}" if encoding else base_tag
+
+
+class ResponseCache:
+    """Small LRU of encoded bodies keyed by ETag and content-coding"""
+
+    def __init__(self, maxsize=Config.RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+def conditional_json(etag_func):
+    """
+    Serve a JSON view with a strong ETag, 304s and negotiated compression.
+
+    `etag_func` is called with the view's arguments and must return the
+    base ETag for the current request without touching the data. The view
+    itself only runs when neither the client nor the response cache
+    already has that version; it returns a JSON-serializable payload.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            base_tag = etag_func(*args, **kwargs)
+            encoding = _negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+            cached = response_cache.get((base_tag, encoding))
+
+            # A 304 carries the ETag of the variant a 200 would send. Until
+            # that is known (cached), both variants for this encoding count.
+            if cached is not None:
+                candidates = [_variant_tag(base_tag, cached[1])]
+            else:
+                candidates = [base_tag] + ([_variant_tag(base_tag, encoding)] if encoding else [])
+            matched = _if_none_match(candidates)
+            if matched is not None:
+                response = Response(status=304)
+                response.vary.add('Accept-Encoding')
+                response.set_etag(matched)
+                return response
+
+            if cached is not None:
+                body, used_encoding = cached
+            else:
+                body = dumps(view(*args, **kwargs))
+                used_encoding = None
+                if encoding and len(body) >= Config.COMPRESS_MIN_SIZE:
+                    body = _compress(body, encoding)
+                    used_encoding = encoding
+                response_cache.put((base_tag, encoding), (body, used_encoding))
+
+            response = Response(body, mimetype='application/json')
+            response.vary.add('Accept-Encoding')
+            if used_encoding:
+                response.headers['Content-Encoding'] = used_encoding
+            response.set_etag(_variant_tag(base_tag, used_encoding))
+            return response
+        return wrapper
+    return decorator
+
+
+# Singleton instance
+data_versions = DataVersions()
@@ -0,0 +1,128 @@
+import hashlib
+import threading
+from collections import deque
+
+from config import Config
+from caching import data_versions
+
+
+class ChangeFeed:
+    """
+    Bounded per-cell log of heatmap point mutations.
+
+    Sequence numbers come from DataVersions, so a region's ETag version
+    and its change-feed cursor are the same number. Each grid cell keeps
+    at most `max_changes` entries; once older entries are evicted, clients
+    whose cursor predates them must resync.
+    """
+
+    def __init__(self, versions, max_changes=Config.CHANGELOG_CELL_SIZE):
+        self.versions = versions
+        self.max_changes = max_changes
+        self.cells = {}    # (row, col) -> deque of (seq, op, point)
+        self.horizon = {}  # (row, col) -> highest seq evicted from that cell
+        self._lock = threading.Lock()
+
+    def record(self, op, point):
+        """
+        Log a mutation of a heatmap point ('add', 'update' or 'remove').
+        `point` must carry id, lat and lng. Returns the sequence number.
+        """
+        with self._lock:
+            return self._append(op, point)
+
+    def record_many(self, op, points):
+        """Log the same mutation for many points under a single lock"""
+        with self._lock:
+            for point in points:
+                self._append(op, point)
+
+    def _append(self, op, point):
+        seq = self.versions.bump(point['lat'], point['lng'])
+        cell = self.versions.cell(point['lat'], point['lng'])
+
+        log = self.cells.get(cell)
+        if log is None:
+            log = self.cells[cell] = deque()
+        if len(log) >= self.max_changes:
+            self.horizon[cell] = log.popleft()[0]
+        log.append((seq, op, point))
+        return seq
+
+    @staticmethod
+    def _region_key(region):
+        return hashlib.blake2b(repr(region).encode('utf-8'), digest_size=4).hexdigest()
+
+    def cursor(self, version, *region):
+        """
+        Opaque cursor string. It is bound to the query that produced it
+        (e.g. lat, lng, radius) and the epoch invalidates it across restarts.
+        """
+        return f"{self.versions.epoch}.{self._region_key(region)}.{version}"
+
+    def parse_cursor(self, cursor, *region):
+        """
+        Return the sequence number of a cursor, or None if it can't be used
+        for this region (other process, other query, or malformed).
+        """
+        parts = (cursor or '').split('.')
+        if len(parts) != 3:
+            return None
+        epoch, region_key, seq = parts
+        if epoch != self.versions.epoch or region_key != self._region_key(region):
+            return None
+        if not seq.isdigit():
+            return None
+        return int(seq)
+
+    def changes_since(self, lat, lng, delta, since):
+        """
+        Collapse the changes after `since` for points within lat/lng +- delta.
+        Returns (added, updated, removed), or None when the log no longer
+        reaches back to `since` and the client must do a full resync.
+        """
+        min_row, min_col = self.versions.cell(lat - delta, lng - delta)
+        max_row, max_col = self.versions.cell(lat + delta, lng + delta)
+
+        entries = []
+        with self._lock:
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    cell = (row, col)
+                    if self.horizon.get(cell, 0) > since:
+                        return None
+                    log = self.cells.get(cell)
+                    if not log:
+                        continue
+                    # Logs are in sequence order; walk back from the newest
+                    for entry in reversed(log):
+                        if entry[0] <= since:
+                            break
+                        entries.append(entry)
+
+        entries.sort(key=lambda entry: entry[0])
+
+        first_op = {}
+        latest = {}
+        for seq, op, point in entries:
+            if abs(point['lat'] - lat) >= delta or abs(point['lng'] - lng) >= delta:
+                continue
+            first_op.setdefault(point['id'], op)
+            latest[point['id']] = (op, point)
+
+        added, updated, removed = [], [], []
+        for point_id, (op, point) in latest.items():
+            if op == 'remove':
+                # Points created and removed within the window never reached the client
+                if first_op[point_id] != 'add':
+                    removed.append(point_id)
+            elif first_op[point_id] == 'add':
+                added.append(point)
+            else:
+                updated.append(point)
+
+        return added, updated, removed
+
+
+# Singleton instance
+change_feed = ChangeFeed(data_versions)
@@ -0,0 +1,211 @@
+import heapq
+import itertools
+import math
+import threading
+from datetime import datetime
+
+from config import Config
+
+METERS_PER_DEGREE = 111320.0
+
+
+def _timestamp(report):
+    return datetime.fromisoformat(report['timestamp']).timestamp()
+
+
+class IncidentClusterer:
+    """
+    Online, grid-accelerated DBSCAN-style clustering of reports into incidents.
+
+    Recent report locations are indexed in a grid whose cells are `radius`
+    wide, so finding a new report's neighbours only looks at the
+    surrounding cells. Reports within `radius` metres and `window` seconds
+    of an indexed report join its incident; a report that links several
+    incidents merges them (density connectivity). Points older than the
+    window behind the newest report are evicted from the index, keeping
+    each insert proportional to the local neighbour count.
+    """
+
+    def __init__(self, radius=Config.CLUSTER_RADIUS_M, window=Config.CLUSTER_WINDOW_MINUTES * 60):
+        self.radius = radius
+        self.window = window
+        self.cell_size = radius / METERS_PER_DEGREE
+        self.incidents = {}       # incident id -> incident
+        self._next_id = 1
+        self._grid = {}           # (row, col) -> list of [lat, lng, time, incident id]
+        self._expiry = []         # heap of (time, sequence, cell, entry)
+        self._sequence = itertools.count()  # tie-breaker so entries are never compared
+        self._latest = float('-inf')
+        self._lock = threading.Lock()
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def _evict(self):
+        cutoff = self._latest - self.window
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, _, cell, entry = heapq.heappop(self._expiry)
+            bucket = self._grid.get(cell)
+            if bucket is not None:
+                for index, candidate in enumerate(bucket):
+                    if candidate is entry:
+                        del bucket[index]
+                        break
+                if not bucket:
+                    del self._grid[cell]
+
+    def _neighbour_incidents(self, lat, lng, when):
+        """Ids of incidents with an indexed report within radius and window"""
+        row, col = self._cell(lat, lng)
+        # Longitude degrees shrink with latitude, so widen the column search
+        col_span = math.ceil(1 / max(math.cos(math.radians(lat)), 0.01))
+        lng_scale = math.cos(math.radians(lat)) * METERS_PER_DEGREE
+        radius_sq = self.radius * self.radius
+
+        found = set()
+        for r in range(row - 1, row + 2):
+            for c in range(col - col_span, col + col_span + 1):
+                for p_lat, p_lng, p_time, incident_id in self._grid.get((r, c), ()):
+                    if incident_id in found or abs(p_time - when) > self.window:
+                        continue
+                    dy = (p_lat - lat) * METERS_PER_DEGREE
+                    dx = (p_lng - lng) * lng_scale
+                    if dx * dx + dy * dy <= radius_sq:
+                        found.add(incident_id)
+        return found
+
+    def _new_incident(self, report, when):
+        incident = {
+            "id": self._next_id,
+            "latitude": report['latitude'],
+            "longitude": report['longitude'],
+            "incident_type": report['incident_type'],
+            "severity": report['severity'],
+            "report_ids": [],
+            "report_count": 0,
+            "upvotes": 0,
+            "downvotes": 0,
+            "verified": False,
+            "first_seen": report['timestamp'],
+            "last_seen": report['timestamp'],
+            "_first_time": when,
+            "_last_time": when,
+            "_entries": []  # this incident's grid index entries
+        }
+        self._next_id += 1
+        self.incidents[incident['id']] = incident
+        return incident
+
+    def _attach(self, incident, report, when):
+        incident['report_ids'].append(report['id'])
+        incident['report_count'] += 1
+        incident['severity'] = max(incident['severity'], report['severity'])
+        incident['upvotes'] += report.get('upvotes', 0)
+        incident['downvotes'] += report.get('downvotes', 0)
+        incident['verified'] = incident['verified'] or report.get('verified', False)
+        if when > incident['_last_time']:
+            incident['_last_time'] = when
+            incident['last_seen'] = report['timestamp']
+        if when < incident['_first_time']:
+            incident['_first_time'] = when
+            incident['first_seen'] = report['timestamp']
+        report['incident_id'] = incident['id']
+
+    def _merge(self, survivor, absorbed, reports_by_id):
+        """Fold `absorbed` into `survivor`; returns the absorbed incident"""
+        del self.incidents[absorbed['id']]
+        survivor['report_ids'].extend(absorbed['report_ids'])
+        survivor['report_count'] += absorbed['report_count']
+        survivor['severity'] = max(survivor['severity'], absorbed['severity'])
+        survivor['upvotes'] += absorbed['upvotes']
+        survivor['downvotes'] += absorbed['downvotes']
+        survivor['verified'] = survivor['verified'] or absorbed['verified']
+        if absorbed['_last_time'] > survivor['_last_time']:
+            survivor['_last_time'] = absorbed['_last_time']
+            survivor['last_seen'] = absorbed['last_seen']
+        if absorbed['_first_time'] < survivor['_first_time']:
+            survivor['_first_time'] = absorbed['_first_time']
+            survivor['first_seen'] = absorbed['first_seen']
+
+        for report_id in absorbed['report_ids']:
+            report = reports_by_id(report_id)
+            if report is not None:
+                report['incident_id'] = survivor['id']
+        # Re-point index entries so later neighbours find the survivor
+        for entry in absorbed['_entries']:
+            entry[3] = survivor['id']
+        survivor['_entries'].extend(absorbed['_entries'])
+        return absorbed
+
+    def add(self, report, reports_by_id=lambda report_id: None):
+        """
+        Cluster one report (sets report['incident_id']).
+        Returns (incident, created, merged) where merged lists incidents
+        that were absorbed into `incident` and no longer exist.
+        """
+        when = _timestamp(report)
+        lat, lng = report['latitude'], report['longitude']
+
+        with self._lock:
+            if when > self._latest:
+                self._latest = when
+                self._evict()
+
+            neighbours = [self.incidents[i] for i in self._neighbour_incidents(lat, lng, when)]
+            merged = []
+            if not neighbours:
+                incident = self._new_incident(report, when)
+                created = True
+            else:
+                # The oldest incident is canonical and keeps its location
+                neighbours.sort(key=lambda incident: incident['id'])
+                incident = neighbours[0]
+                created = False
+                for other in neighbours[1:]:
+                    merged.append(self._merge(incident, other, reports_by_id))
+
+            self._attach(incident, report, when)
+
+            # A report already outside the window would be evicted at once
+            if when >= self._latest - self.window:
+                entry = [lat, lng, when, incident['id']]
+                cell = self._cell(lat, lng)
+                self._grid.setdefault(cell, []).append(entry)
+                # Late reports arrive out of time order, so expire through a heap
+                heapq.heappush(self._expiry, (when, next(self._sequence), cell, entry))
+                incident['_entries'].append(entry)
+
+        return incident, created, merged
+
+    def vote(self, report, action):
+        """Apply a report vote to its incident; returns the incident"""
+        incident = self.incidents.get(report.get('incident_id'))
+        if incident is None:
+            return None
+        if action == 'upvote':
+            incident['upvotes'] += 1
+        elif action == 'downvote':
+            incident['downvotes'] += 1
+        incident['verified'] = incident['verified'] or report['verified']
+        return incident
+
+    def recluster(self, reports):
+        """
+        Rebuild every incident from scratch in timestamp order (for
+        backfills of historical data). Returns (old incidents, new incidents).
+        """
+        with self._lock:
+            old = list(self.incidents.values())
+            self.incidents = {}
+            self._grid = {}
+            self._expiry = []
+            self._latest = float('-inf')
+
+        by_id = {report['id']: report for report in reports}
+        for report in sorted(reports, key=_timestamp):
+            self.add(report, by_id.get)
+        return old, list(self.incidents.values())
+
+
+# Singleton instance
+clusterer = IncidentClusterer()
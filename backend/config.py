@@ -23,6 +23,11 @@ class Config:
     # Map API Keys
     GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY', '')
     
+    # Offline reverse geocoding (build the index with gazetteer.py)
+    GAZETTEER_PATH = os.getenv('GAZETTEER_PATH', 'data/gazetteer.bin')
+    GAZETTEER_MAX_DISTANCE_M = float(os.getenv('GAZETTEER_MAX_DISTANCE_M', 250))
+    GEOCODER_OFFLINE_ONLY = os.getenv('GEOCODER_OFFLINE_ONLY', 'False') == 'True'  # never call network providers (forward geocoding then always misses)
+    
     # Security
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
     
@@ -32,4 +37,47 @@ class Config:
     # File Upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = 'uploads/'
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'mp4', 'mov'}
\ No newline at end of file
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'mp4', 'mov'}
+    MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 200 * 1024 * 1024))  # 200MB per file (sent in chunks)
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Suggested chunk size, must stay below MAX_CONTENT_LENGTH
+    UPLOAD_BLOCK_SIZE = 64 * 1024  # Bytes copied from the request stream at a time
+    UPLOAD_SESSION_TTL = 24 * 60 * 60  # Seconds before an idle upload is discarded
+    MEDIA_WORKERS = int(os.getenv('MEDIA_WORKERS', 2))
+    THUMBNAIL_SIZE = (320, 320)
+    TRANSCODE_TIMEOUT = 600  # seconds
+    
+    # Bulk import
+    MAX_BULK_IMPORT_SIZE = int(os.getenv('MAX_BULK_IMPORT_SIZE', 1024 * 1024 * 1024))  # 1GB
+    BULK_BATCH_SIZE = 5000  # rows validated and inserted together
+    BULK_READ_BUFFER_SIZE = 1 << 20  # bytes read from the request body at a time
+    BULK_MAX_ERRORS = 1000  # row errors returned in the response
+    
+    # Incident clustering (duplicate report merging)
+    CLUSTER_RADIUS_M = float(os.getenv('CLUSTER_RADIUS_M', 150))  # metres
+    CLUSTER_WINDOW_MINUTES = float(os.getenv('CLUSTER_WINDOW_MINUTES', 30))
+    
+    # Report export
+    EXPORT_PAGE_SIZE = 5000  # rows per keyset page / record batch
+    EXPORT_SCAN_FACTOR = 4  # rows scanned per page at most, as a multiple of the page size
+    EXPORT_PAGE_DELAY = 0.005  # seconds yielded to live traffic between pages
+    EXPORT_NICENESS = 10  # CPU niceness for the export CLI
+    
+    # Response caching
+    VERSION_CELL_SIZE = 0.1  # degrees per data-version grid cell
+    RESPONSE_CACHE_SIZE = 256  # encoded responses kept in memory
+    COMPRESS_MIN_SIZE = 1024  # bytes; smaller bodies are sent uncompressed
+    HEATMAP_MAX_POINTS = int(os.getenv('HEATMAP_MAX_POINTS', 50))  # points in a full heatmap response
+    CHANGELOG_CELL_SIZE = 1000  # changes kept per grid cell for delta sync
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 5
+    
+    # Startup
+    # eager: load the model before serving, background: load it in a
+    # warm-up thread, lazy: load it on the first prediction
+    MODEL_LOAD_MODE = os.getenv('MODEL_LOAD_MODE', 'background')
+    
+    # Monitoring
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'False') == 'True'  # exposes stack traces, keep off in production
+    PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', '0.01'))  # seconds between samples
+    PROFILER_MIN_INTERVAL = 0.001  # shorter intervals spend the process on sampling
\ No newline at end of file
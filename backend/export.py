@@ -0,0 +1,338 @@
+"""
+Streaming report export as NDJSON, Arrow IPC or Parquet.
+
+Reports are read in pages with keyset cursors (id > last seen id), so
+only one page is held in memory at a time regardless of export size.
+Used by GET /api/reports/export (in-memory store) and as a CLI against
+MongoDB:
+
+    python export.py --format parquet --bbox 77.0,28.4,77.4,28.8 \\
+        --start 2024-01-01 --type harassment,theft --out reports.parquet
+"""
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from config import Config
+from caching import dumps
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Column -> Python type, matching the Arrow schema in _arrow_schema
+COLUMNS = {
+    'id': int, 'user_id': str, 'latitude': float, 'longitude': float,
+    'incident_type': str, 'severity': int, 'description': str,
+    'timestamp': str, 'verified': bool, 'upvotes': int, 'downvotes': int,
+    'status': str, 'incident_id': int
+}
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class ExportError(Exception):
+    """Raised for invalid export parameters"""
+
+
+class ExportFilter:
+    """bbox / time range / incident type filter shared by all sources"""
+
+    def __init__(self, bbox=None, start=None, end=None, types=None):
+        self.bbox = bbox    # (min_lng, min_lat, max_lng, max_lat)
+        self.start = start  # ISO timestamp strings
+        self.end = end
+        self.types = set(types) if types else None
+
+    @classmethod
+    def from_args(cls, bbox=None, start=None, end=None, types=None):
+        """Build a filter from query-string style values"""
+        if bbox:
+            try:
+                bbox = tuple(float(part) for part in bbox.split(','))
+            except ValueError:
+                bbox = ()
+            if len(bbox) != 4:
+                raise ExportError("bbox must be min_lng,min_lat,max_lng,max_lat")
+        for value in (start, end):
+            if value:
+                try:
+                    datetime.fromisoformat(value)
+                except ValueError:
+                    raise ExportError(f"Invalid ISO timestamp: {value}")
+        types = [t.strip() for t in types.split(',') if t.strip()] if types else None
+        return cls(bbox or None, start or None, end or None, types)
+
+    def matches(self, report):
+        if self.bbox:
+            min_lng, min_lat, max_lng, max_lat = self.bbox
+            if not (min_lat <= report['latitude'] <= max_lat
+                    and min_lng <= report['longitude'] <= max_lng):
+                return False
+        # The in-memory store keeps ISO strings, which sort chronologically
+        if self.start and report['timestamp'] < self.start:
+            return False
+        if self.end and report['timestamp'] >= self.end:
+            return False
+        if self.types and report['incident_type'] not in self.types:
+            return False
+        return True
+
+    def mongo_query(self):
+        query = {}
+        if self.bbox:
+            min_lng, min_lat, max_lng, max_lat = self.bbox
+            # $box only applies to legacy pairs; location is GeoJSON under a 2dsphere index
+            ring = [[min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat],
+                    [min_lng, max_lat], [min_lng, min_lat]]
+            query['location'] = {'$geoWithin': {'$geometry': {'type': 'Polygon', 'coordinates': [ring]}}}
+        if self.start or self.end:
+            # Stored timestamps are BSON dates, which never match strings
+            query['timestamp'] = {}
+            if self.start:
+                query['timestamp']['$gte'] = datetime.fromisoformat(self.start)
+            if self.end:
+                query['timestamp']['$lt'] = datetime.fromisoformat(self.end)
+        if self.types:
+            query['incident_type'] = {'$in': sorted(self.types)}
+        return query
+
+
+# --- Sources: yield pages of rows using keyset pagination ---
+
+def memory_pages(reports, export_filter, page_size=Config.EXPORT_PAGE_SIZE):
+    """
+    Page through the in-memory report list. Report ids are 1-based
+    positions, so the keyset cursor is also the list offset.
+    """
+    last_id = 0
+    while last_id < len(reports):
+        # Scan a bounded window so sparse filters don't stall a page
+        window = reports[last_id:last_id + page_size * Config.EXPORT_SCAN_FACTOR]
+        page = []
+        for report in window:
+            last_id = report['id']
+            if export_filter.matches(report):
+                row = _checked_row(report)
+                if row is not None:
+                    page.append(row)
+                if len(page) >= page_size:
+                    break
+        # Empty pages are still yielded so throttling applies while scanning
+        yield page
+
+
+def mongo_pages(collection, export_filter, page_size=Config.EXPORT_PAGE_SIZE):
+    """Page through a MongoDB collection ordered by _id"""
+    query = export_filter.mongo_query()
+    last_id = None
+    while True:
+        page_query = dict(query)
+        if last_id is not None:
+            page_query['_id'] = {'$gt': last_id}
+        docs = list(collection.find(page_query).sort('_id', 1).limit(page_size))
+        if not docs:
+            return
+        last_id = docs[-1]['_id']
+        rows = (_checked_row(_from_mongo(doc)) for doc in docs)
+        yield [row for row in rows if row is not None]
+
+
+def _from_mongo(doc):
+    report = dict(doc)
+    coordinates = (doc.get('location') or {}).get('coordinates')
+    if coordinates and 'latitude' not in report:
+        report['longitude'], report['latitude'] = coordinates[0], coordinates[1]
+    if 'id' not in report:
+        report['id'] = None
+    timestamp = report.get('timestamp')
+    if hasattr(timestamp, 'isoformat'):
+        report['timestamp'] = timestamp.isoformat()
+    return report
+
+
+def _row(report):
+    """
+    Pick the export columns, coerced to their schema types (None stays None).
+    Raises ValueError for values the Arrow schema can't hold.
+    """
+    row = {}
+    for column, cast in COLUMNS.items():
+        value = report.get(column)
+        if value is not None:
+            value = cast(value)
+            if cast is int and not INT64_MIN <= value <= INT64_MAX:
+                raise ValueError(f"{column} out of range: {value}")
+        row[column] = value
+    return row
+
+
+def _checked_row(report):
+    """
+    _row, or None for a report that can't be exported. Bad rows are
+    dropped before encoding; once streaming starts an error would
+    truncate the body behind a 200.
+    """
+    try:
+        return _row(report)
+    except (TypeError, ValueError) as e:
+        logger.warning("Skipping report %s in export: %s", report.get('id'), e)
+        return None
+
+
+# --- Encoders: turn pages into byte chunks ---
+
+def _arrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ExportError("pyarrow is required for arrow and parquet exports")
+    return pyarrow
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ('id', pa.int64()), ('user_id', pa.string()),
+        ('latitude', pa.float64()), ('longitude', pa.float64()),
+        ('incident_type', pa.string()), ('severity', pa.int64()),
+        ('description', pa.string()), ('timestamp', pa.string()),
+        ('verified', pa.bool_()), ('upvotes', pa.int64()),
+        ('downvotes', pa.int64()), ('status', pa.string()),
+        ('incident_id', pa.int64())
+    ])
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _ndjson_chunks(pages):
+    for page in pages:
+        if page:
+            yield b''.join(dumps(row) + b'\n' for row in page)
+
+
+def _arrow_chunks(pages, fmt):
+    pa = _arrow()
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+        write = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+        write = writer.write_batch
+
+    for page in pages:
+        if not page:
+            continue
+        write(pa.RecordBatch.from_pylist(page, schema=schema))
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(pages, fmt, pause=None):
+    """
+    Encode pages as `fmt`, yielding byte chunks.
+    `pause` is called between pages so exports yield to live traffic.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unsupported format: {fmt}")
+    if fmt != 'ndjson':
+        _arrow()  # Fail before streaming starts if pyarrow is missing
+
+    def throttled():
+        for page in pages:
+            yield page
+            if pause:
+                pause(Config.EXPORT_PAGE_DELAY)
+
+    if fmt == 'ndjson':
+        return _ndjson_chunks(throttled())
+    return _arrow_chunks(throttled(), fmt)
+
+
+def _lower_io_priority():
+    """
+    Move this process to the idle I/O class (Linux), so writing the
+    export only uses the disk when nothing else needs it. os.nice only
+    lowers CPU priority. Best effort: skipped without ionice.
+    """
+    ionice = shutil.which('ionice')
+    if not ionice:
+        return
+    result = subprocess.run([ionice, '-c', '3', '-p', str(os.getpid())], capture_output=True)
+    if result.returncode != 0:
+        logger.warning("Could not lower I/O priority: %s", result.stderr.decode(errors='replace').strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export reports from MongoDB")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+    parser.add_argument('--bbox', help="min_lng,min_lat,max_lng,max_lat")
+    parser.add_argument('--start', help="ISO timestamp (inclusive)")
+    parser.add_argument('--end', help="ISO timestamp (exclusive)")
+    parser.add_argument('--type', help="comma-separated incident types")
+    parser.add_argument('--out', help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    # Run at low CPU and I/O priority so exports don't compete with the API
+    os.nice(Config.EXPORT_NICENESS)
+    _lower_io_priority()
+
+    from database import db_instance
+
+    export_filter = ExportFilter.from_args(args.bbox, args.start, args.end, args.type)
+    chunks = stream_export(mongo_pages(db_instance.reports, export_filter), args.format, time.sleep)
+
+    out = open(args.out, 'wb') if args.out else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Offline reverse geocoding from a local gazetteer index.
+
+The index is a single binary file built from a place/street extract of
+OpenStreetMap and memory-mapped at runtime, so opening it is O(1) and
+only the pages touched by lookups are read from disk. Entries are
+sorted by grid cell; a lookup binary-searches the cells around the
+query point and returns the nearest entry.
+
+Build an index from NDJSON (one object per line with lat, lon,
+display_name and a Nominatim-style "address" object) or CSV (lat, lon,
+display_name plus address fields such as amenity, road, suburb, city
+as columns). An extract in that shape can be produced with e.g.
+`osmium export --geometry-types=point -f geojsonseq` and a small
+conversion step.
+
+    python gazetteer.py build places.ndjson data/gazetteer.bin
+    python gazetteer.py lookup data/gazetteer.bin 28.6139 77.2090
+"""
+import argparse
+import csv
+import json
+import math
+import mmap
+import struct
+from bisect import bisect_left, bisect_right
+
+MAGIC = b'SSGZ'
+VERSION = 2  # 2: u64 blob offsets
+# magic, version, entry count, cell size (degrees), blob length
+HEADER = struct.Struct('<4sIQdQ')
+METERS_PER_DEGREE = 111320.0
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class _Grid:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cols = math.ceil(360 / cell_size)
+
+    def row_col(self, lat, lng):
+        return (math.floor((lat + 90) / self.cell_size),
+                math.floor((lng + 180) / self.cell_size) % self.cols)
+
+    def key(self, row, col):
+        return row * self.cols + col
+
+
+def build_gazetteer(rows, path, cell_size=0.005):
+    """
+    Write an index for `rows` of (lat, lon, address dict, display name).
+    Layout after the header, each section 8-byte aligned:
+    keys (u64), lats (f32), lons (f32), blob offsets (u64, count + 1),
+    and a UTF-8 blob of per-entry JSON.
+    """
+    grid = _Grid(cell_size)
+    entries = []
+    for lat, lon, address, display_name in rows:
+        key = grid.key(*grid.row_col(lat, lon))
+        payload = json.dumps({"a": address, "d": display_name},
+                             separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        entries.append((key, lat, lon, payload))
+    entries.sort(key=lambda entry: entry[0])
+
+    count = len(entries)
+    offsets = [0]
+    for entry in entries:
+        offsets.append(offsets[-1] + len(entry[3]))
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, cell_size, offsets[-1]))
+        for fmt, values in (('Q', [e[0] for e in entries]),
+                            ('f', [e[1] for e in entries]),
+                            ('f', [e[2] for e in entries]),
+                            ('Q', offsets)):
+            f.write(b'\0' * (_align(f.tell()) - f.tell()))
+            f.write(struct.pack(f'<{len(values)}{fmt}', *values))
+        f.write(b'\0' * (_align(f.tell()) - f.tell()))
+        for entry in entries:
+            f.write(entry[3])
+
+    return count
+
+
+class Gazetteer:
+    """Memory-mapped gazetteer index"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._read_sections()
+        except ValueError:
+            self.close()
+            raise
+
+    def _read_sections(self):
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"{self.path} is too short to be a gazetteer index")
+        magic, version, count, cell_size, blob_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a gazetteer index (version {VERSION})")
+
+        self.count = count
+        self.grid = _Grid(cell_size)
+
+        layout = []
+        offset = HEADER.size
+        for fmt, itemsize, length in (('Q', 8, count), ('f', 4, count),
+                                      ('f', 4, count), ('Q', 8, count + 1)):
+            offset = _align(offset)
+            layout.append((offset, fmt, itemsize * length))
+            offset += itemsize * length
+        blob_offset = _align(offset)
+        if blob_offset + blob_size > len(self._mmap):
+            raise ValueError(f"{self.path} is truncated")
+
+        view = memoryview(self._mmap)
+        self.keys, self.lats, self.lons, self.offsets = (
+            view[start:start + size].cast(fmt) for start, fmt, size in layout
+        )
+        self.blob = view[blob_offset:blob_offset + blob_size]
+
+    def close(self):
+        # Views into the map must be released before it can close
+        for name in ('keys', 'lats', 'lons', 'offsets', 'blob'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        payload = json.loads(bytes(self.blob[start:end]).decode('utf-8'))
+        return payload['a'], payload['d']
+
+    def nearest(self, lat, lng, max_distance):
+        """
+        Nearest entry within max_distance metres.
+        Returns (address, display_name, distance) or None.
+        """
+        row, col = self.grid.row_col(lat, lng)
+        lng_scale = math.cos(math.radians(lat))
+        # Cells to search in each direction to cover max_distance
+        row_span = math.ceil(max_distance / METERS_PER_DEGREE / self.grid.cell_size)
+        col_span = math.ceil(row_span / max(lng_scale, 0.01))
+
+        best_index, best_sq = None, (max_distance / METERS_PER_DEGREE) ** 2
+        for r in range(row - row_span, row + row_span + 1):
+            # Cells of one row are contiguous in key order
+            first = self.grid.key(r, max(col - col_span, 0))
+            last = self.grid.key(r, min(col + col_span, self.grid.cols - 1))
+            lo = bisect_left(self.keys, first)
+            hi = bisect_right(self.keys, last, lo)
+            for i in range(lo, hi):
+                dy = self.lats[i] - lat
+                dx = (self.lons[i] - lng) * lng_scale
+                distance_sq = dx * dx + dy * dy
+                if distance_sq <= best_sq:
+                    best_index, best_sq = i, distance_sq
+
+        if best_index is None:
+            return None
+        address, display_name = self._entry(best_index)
+        return address, display_name, math.sqrt(best_sq) * METERS_PER_DEGREE
+
+
+def _read_rows(path):
+    """Yield (lat, lon, address, display_name) from an NDJSON or CSV gazetteer"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(f):
+                lat, lon = float(row.pop('lat')), float(row.pop('lon'))
+                display_name = row.pop('display_name', '')
+                address = {k: v for k, v in row.items() if v}
+                yield lat, lon, address, display_name
+        else:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield (float(row['lat']), float(row['lon']),
+                           row.get('address', {}), row.get('display_name', ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query an offline gazetteer index")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="build an index from NDJSON or CSV")
+    build.add_argument('source')
+    build.add_argument('index')
+    build.add_argument('--cell-size', type=float, default=0.005, help="grid cell size in degrees")
+
+    lookup = commands.add_parser('lookup', help="reverse geocode a point")
+    lookup.add_argument('index')
+    lookup.add_argument('lat', type=float)
+    lookup.add_argument('lng', type=float)
+    lookup.add_argument('--max-distance', type=float, default=250, help="metres")
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        count = build_gazetteer(_read_rows(args.source), args.index, args.cell_size)
+        print(f"Indexed {count} places into {args.index}")
+    else:
+        result = Gazetteer(args.index).nearest(args.lat, args.lng, args.max_distance)
+        print(json.dumps(result, ensure_ascii=False, indent=2) if result else "No match")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,29 @@ import requests
 from config import Config
 import json
 from functools import lru_cache
+import logging
+import os
 import time
+from gazetteer import Gazetteer
+from metrics import geocode_upstream_duration, geocode_errors, offline_geocode_lookups
+
+logger = logging.getLogger(__name__)
 
 class GeocodingService:
     def __init__(self):
         self.api_key = Config.GOOGLE_MAPS_API_KEY
         self.use_nominatim = not self.api_key  # Fallback to free service
+        self.gazetteer = self._open_gazetteer()
+    
+    def _open_gazetteer(self):
+        """Memory-map the local gazetteer index if one is configured"""
+        if not os.path.exists(Config.GAZETTEER_PATH):
+            return None
+        try:
+            return Gazetteer(Config.GAZETTEER_PATH)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not open gazetteer %s: %s", Config.GAZETTEER_PATH, e)
+            return None
     
     @lru_cache(maxsize=1000)
     def reverse_geocode(self, latitude, longitude):
@@ -15,11 +32,36 @@ class GeocodingService:
         Convert coordinates to human-readable address
         Returns: {'name': 'Place Name', 'address': 'Full Address'}
         """
+        # Local index first; network providers only for misses
+        if self.gazetteer is not None:
+            result = self._offline_reverse_geocode(latitude, longitude)
+            if result:
+                return result
+        
+        if Config.GEOCODER_OFFLINE_ONLY:
+            return self._default_reverse_geocode(latitude, longitude)
+        
         if self.api_key and not self.use_nominatim:
             return self._google_reverse_geocode(latitude, longitude)
         else:
             return self._nominatim_reverse_geocode(latitude, longitude)
     
+    def _offline_reverse_geocode(self, lat, lng):
+        """Use the memory-mapped gazetteer (no network)"""
+        match = self.gazetteer.nearest(lat, lng, Config.GAZETTEER_MAX_DISTANCE_M)
+        if match is None:
+            offline_geocode_lookups.labels('miss').inc()
+            return None
+        
+        offline_geocode_lookups.labels('hit').inc()
+        address, display_name, _ = match
+        return {
+            'place_name': self._extract_nominatim_place_name(address),
+            'full_address': display_name,
+            'components': address,
+            'source': 'offline'
+        }
+    
     def _google_reverse_geocode(self, lat, lng):
         """Use Google Maps Geocoding API"""
         try:
@@ -30,8 +72,9 @@ class GeocodingService:
                 'result_type': 'street_address|premise|point_of_interest'
             }
             
-            response = requests.get(url, params=params, timeout=5)
-            data = response.json()
+            with geocode_upstream_duration.labels('reverse', 'google').time():
+                response = requests.get(url, params=params, timeout=5)
+                data = response.json()
             
             if data['status'] == 'OK' and data['results']:
                 result = data['results'][0]
@@ -48,7 +91,8 @@ class GeocodingService:
                 }
         
         except Exception as e:
-            print(f"Google geocoding error: {e}")
+            geocode_errors.labels('reverse', 'google').inc()
+            logger.warning("Google geocoding error: %s", e)
         
         return self._nominatim_reverse_geocode(lat, lng)  # Fallback
     
@@ -68,8 +112,9 @@ class GeocodingService:
                 'User-Agent': 'SafeStree-App/1.0'
             }
             
-            response = requests.get(url, params=params, headers=headers, timeout=5)
-            data = response.json()
+            with geocode_upstream_duration.labels('reverse', 'nominatim').time():
+                response = requests.get(url, params=params, headers=headers, timeout=5)
+                data = response.json()
             
             if 'display_name' in data:
                 # Extract place name from address components
@@ -84,9 +129,15 @@ class GeocodingService:
                 }
         
         except Exception as e:
-            print(f"Nominatim geocoding error: {e}")
+            geocode_errors.labels('reverse', 'nominatim').inc()
+            logger.warning("Nominatim geocoding error: %s", e)
         
         # Return default if both fail
+        geocode_errors.labels('reverse', 'default').inc()
+        return self._default_reverse_geocode(lat, lng)
+    
+    def _default_reverse_geocode(self, lat, lng):
+        """Placeholder result when no provider knows the location"""
         return {
             'place_name': f"Location ({lat:.4f}, {lng:.4f})",
             'full_address': '',
@@ -141,7 +192,14 @@ class GeocodingService:
         return "Unknown Location"
     
     def forward_geocode(self, place_name):
-        """Convert place name to coordinates"""
+        """
+        Convert place name to coordinates.
+        The gazetteer is indexed by location only, so with
+        GEOCODER_OFFLINE_ONLY there is no forward geocoding (None).
+        """
+        if Config.GEOCODER_OFFLINE_ONLY:
+            return None
+        
         try:
             if self.api_key and not self.use_nominatim:
                 url = f"https://maps.googleapis.com/maps/api/geocode/json"
@@ -150,8 +208,9 @@ class GeocodingService:
                     'key': self.api_key
                 }
                 
-                response = requests.get(url, params=params, timeout=5)
-                data = response.json()
+                with geocode_upstream_duration.labels('forward', 'google').time():
+                    response = requests.get(url, params=params, timeout=5)
+                    data = response.json()
                 
                 if data['status'] == 'OK' and data['results']:
                     location = data['results'][0]['geometry']['location']
@@ -169,8 +228,9 @@ class GeocodingService:
                 }
                 
                 headers = {'User-Agent': 'SafeStree-App/1.0'}
-                response = requests.get(url, params=params, headers=headers, timeout=5)
-                data = response.json()
+                with geocode_upstream_duration.labels('forward', 'nominatim').time():
+                    response = requests.get(url, params=params, headers=headers, timeout=5)
+                    data = response.json()
                 
                 if data:
                     return {
@@ -179,7 +239,9 @@ class GeocodingService:
                     }
         
         except Exception as e:
-            print(f"Forward geocoding error: {e}")
+            source = 'google' if self.api_key and not self.use_nominatim else 'nominatim'
+            geocode_errors.labels('forward', source).inc()
+            logger.warning("Forward geocoding error: %s", e)
         
         return None
 
@@ -0,0 +1,69 @@
+"""
+Import-time profile of the backend.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter and
+reports the slowest imports, so cold-start regressions (e.g. a heavy
+library imported at module level again) show up in CI.
+
+Usage:
+    python import_profile.py [--module app] [--top 20] [--max-ms 500]
+
+Exits with status 1 when the total import time exceeds --max-ms.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+def profile_imports(module):
+    """Return (total_us, [(cumulative_us, self_us, name), ...]) for importing `module`"""
+    env = dict(os.environ)
+    # Don't let the model warm-up thread skew the measurement
+    env.setdefault('MODEL_LOAD_MODE', 'lazy')
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    entries = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        self_us, cumulative_us = int(self_us), int(cumulative_us)
+        entries.append((cumulative_us, self_us, name.rstrip()))
+        if name.strip() == module:
+            total_us = cumulative_us
+
+    return total_us, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the backend")
+    parser.add_argument('--module', default='app', help="module to import (default: app)")
+    parser.add_argument('--top', type=int, default=20, help="number of imports to list")
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="fail if the total import time exceeds this many milliseconds")
+    args = parser.parse_args()
+
+    total_us, entries = profile_imports(args.module)
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(entries, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name.strip()}")
+    print(f"\nTotal import time for '{args.module}': {total_us / 1000:.1f} ms")
+
+    if args.max_ms is not None and total_us / 1000 > args.max_ms:
+        print(f"Import time exceeds budget of {args.max_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
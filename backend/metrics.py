@@ -0,0 +1,397 @@
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _StackCounter
+from contextlib import contextmanager
+from functools import wraps
+
+from config import Config
+
+# Latency buckets in seconds (Prometheus client defaults)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5,
+                   0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# Buckets for counts such as socket fan-out size
+SIZE_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class for labelled metrics"""
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Get (or create) the child for the given label values"""
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self):
+        """Render this metric in Prometheus text format"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if not registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Compute the value lazily at scrape time (e.g. a store size)"""
+        self.function = function
+
+    def render(self, name, labelnames, values):
+        value = self.function() if self.function else self.value
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(value)}"]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if not registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the wall-clock duration of the enclosed block"""
+        if not registry.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name, labelnames, values):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = ('le', _format_value(float(bound)))
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+        label_str = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{label_str} {_format_value(total)}")
+        lines.append(f"{name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+class MetricsRegistry:
+    """Holds every metric exposed on /metrics"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+def timed(histogram, *labelvalues):
+    """Decorator that observes the duration of each call"""
+    def decorator(func):
+        child = histogram.labels(*labelvalues)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples the stacks of all threads
+    from a background thread. Output is in collapsed/folded format
+    so it can be fed straight into flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = _StackCounter()
+        self.samples = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=None):
+        """
+        Start sampling (no-op if already running).
+        Raises ValueError for an interval that isn't a number of seconds
+        of at least PROFILER_MIN_INTERVAL.
+        """
+        if interval is not None:
+            interval = self.check_interval(interval)
+        if self.running:
+            return False
+        if interval is not None:
+            self.interval = interval
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return True
+
+    @staticmethod
+    def check_interval(interval):
+        if isinstance(interval, bool) or not isinstance(interval, (int, float)):
+            raise ValueError("interval must be a number of seconds")
+        if not math.isfinite(interval) or interval < Config.PROFILER_MIN_INTERVAL:
+            raise ValueError(f"interval must be at least {Config.PROFILER_MIN_INTERVAL} seconds")
+        return float(interval)
+
+    def stop(self):
+        """Stop sampling; collected stacks are kept until reset()"""
+        if not self.running:
+            return False
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        return True
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own_ident:
+                        continue
+                    self.stacks[self._fold(frame)] += 1
+                self.samples += 1
+
+    @staticmethod
+    def _fold(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            names.append(f"{code.co_name} ({filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def report(self, limit=None):
+        """Return folded stacks, most frequent first"""
+        with self._lock:
+            items = self.stacks.most_common(limit)
+        return '\n'.join(f"{stack} {count}" for stack, count in items) + '\n'
+
+
+# Singleton instances
+registry = MetricsRegistry(enabled=Config.METRICS_ENABLED)
+profiler = SamplingProfiler(interval=Config.PROFILER_INTERVAL)
+
+# Request metrics
+http_request_duration = registry.histogram(
+    'safestree_http_request_duration_seconds',
+    'HTTP request latency by route',
+    ('method', 'route', 'status')
+)
+
+# Prediction metrics
+predict_duration = registry.histogram(
+    'safestree_predict_duration_seconds',
+    'Time spent in the risk prediction pipeline',
+    ('stage',)
+)
+
+# Geocoding metrics
+geocode_upstream_duration = registry.histogram(
+    'safestree_geocode_upstream_duration_seconds',
+    'Latency of upstream geocoding calls by source',
+    ('operation', 'source')
+)
+geocode_errors = registry.counter(
+    'safestree_geocode_errors_total',
+    'Upstream geocoding failures by source',
+    ('operation', 'source')
+)
+offline_geocode_lookups = registry.counter(
+    'safestree_offline_geocode_lookups_total',
+    'Reverse geocoding lookups against the local gazetteer',
+    ('result',)
+)
+
+# Socket.IO metrics
+socket_clients = registry.gauge(
+    'safestree_socket_clients',
+    'Currently connected Socket.IO clients'
+)
+socket_emit_fanout = registry.histogram(
+    'safestree_socket_emit_fanout',
+    'Number of clients a broadcast was sent to',
+    ('event',),
+    buckets=SIZE_BUCKETS
+)
+socket_emit_duration = registry.histogram(
+    'safestree_socket_emit_duration_seconds',
+    'Time spent broadcasting a Socket.IO event',
+    ('event',)
+)
+
+# In-memory store sizes
+store_size = registry.gauge(
+    'safestree_store_items',
+    'Number of items held in the in-memory stores',
+    ('store',)
+)
@@ -1,10 +1,10 @@
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class Location(BaseModel):
-    latitude: float
-    longitude: float
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
     address: Optional[str] = None
 
 class User(BaseModel):
@@ -21,7 +21,7 @@ class Report(BaseModel):
     user_id: str
     location: Location
     incident_type: str  # harassment, assault, theft, etc.
-    severity: int = 3  # 1-5 scale
+    severity: int = Field(3, ge=1, le=5)  # 1-5 scale
     description: str
     timestamp: datetime = datetime.now()
     verified: bool = False
@@ -1,30 +1,94 @@
-import numpy as np
 from datetime import datetime
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-import joblib
+import logging
 import os
+import threading
+import time
+from metrics import predict_duration, timed
+
+# numpy, scikit-learn and joblib are imported on first use so that
+# importing this module (and the app) stays cheap.
+
+logger = logging.getLogger(__name__)
 
 # Simulated ML model (in production, train on real data)
 class SafetyPredictor:
     def __init__(self):
         self.model = None
-        self.load_model()
+        self.load_seconds = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._warmup_thread = None
+    
+    @property
+    def ready(self):
+        return self.model is not None
+    
+    @property
+    def loading(self):
+        return self._warmup_thread is not None and self._warmup_thread.is_alive()
     
     def load_model(self):
         """Load trained model or create a simple one"""
+        import numpy as np
+        import joblib
+        from sklearn.ensemble import RandomForestClassifier
+        
         try:
             self.model = joblib.load('models/safety_model.pkl')
         except:
             # Create a simple model for demo
-            self.model = RandomForestClassifier(n_estimators=10)
+            model = RandomForestClassifier(n_estimators=10)
             # Train on dummy data
             X_dummy = np.random.rand(100, 5)
             y_dummy = np.random.randint(0, 2, 100)
-            self.model.fit(X_dummy, y_dummy)
+            model.fit(X_dummy, y_dummy)
+            self.model = model
+    
+    def ensure_loaded(self):
+        """Load the model if it isn't loaded yet (blocks until it is)"""
+        if self.model is not None:
+            return
+        with self._lock:
+            if self.model is not None:
+                return
+            start = time.perf_counter()
+            try:
+                self.load_model()
+                self.error = None
+            except Exception as e:
+                self.error = str(e)
+                raise
+            finally:
+                self.load_seconds = time.perf_counter() - start
+                predict_duration.labels('load_model').observe(self.load_seconds)
+    
+    def warm_up(self):
+        """Load the model in a background thread"""
+        if self.ready or self.loading:
+            return
+        
+        def run():
+            try:
+                self.ensure_loaded()
+            except Exception as e:
+                logger.error("Model warm-up failed: %s", e)
+        
+        self._warmup_thread = threading.Thread(target=run, name='model-warmup', daemon=True)
+        self._warmup_thread.start()
+    
+    def status(self):
+        return {
+            "model_loaded": self.ready,
+            "loading": self.loading,
+            "load_seconds": self.load_seconds,
+            "error": self.error
+        }
     
+    @timed(predict_duration, 'extract_features')
     def extract_features(self, lat, lng, time_of_day, history):
         """Extract features for prediction"""
+        import numpy as np
+        
         features = [
             lat,  # latitude
             lng,  # longitude
@@ -34,14 +98,17 @@ class SafetyPredictor:
         ]
         return np.array(features).reshape(1, -1)
     
+    @timed(predict_duration, 'model')
     def predict(self, features):
         """Make prediction"""
+        self.ensure_loaded()
         risk_prob = self.model.predict_proba(features)[0][1]
         return float(risk_prob * 100)
 
-# Initialize predictor
+# Initialize predictor (the model itself loads lazily or via warm_up())
 predictor = SafetyPredictor()
 
+@timed(predict_duration, 'total')
 def predict_risk(latitude, longitude, time_of_day, historical_data):
     """
     Predict safety risk for given parameters
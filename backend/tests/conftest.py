@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# Modules in backend/ import each other by top-level name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Don't train the model in a background thread during tests
+os.environ.setdefault('MODEL_LOAD_MODE', 'lazy')
+
+
+@pytest.fixture
+def client():
+    app_module = pytest.importorskip('app')
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def auth_headers():
+    auth = pytest.importorskip('auth')
+    return {"Authorization": f"Bearer {auth.generate_token('test-user')}"}
@@ -0,0 +1,91 @@
+import io
+import json
+
+import pytest
+
+from bulk_import import RowError, import_reports, iter_csv, iter_ndjson
+
+pytest.importorskip('pydantic')
+
+
+def ndjson(*rows):
+    return b''.join((row if isinstance(row, bytes) else json.dumps(row).encode()) + b'\n' for row in rows)
+
+
+def row(**fields):
+    data = {"latitude": 28.61, "longitude": 77.21, "type": "theft", "severity": 2}
+    data.update(fields)
+    return data
+
+
+def run_import(body, fmt='ndjson'):
+    inserted = []
+    summary = import_reports(io.BytesIO(body), fmt, inserted.extend)
+    return summary, inserted
+
+
+def test_iter_ndjson_reports_bad_lines():
+    body = ndjson(row(), b'{not json', b'[1, 2]', b'{"latitude": "\xff"}') + b'\n'
+    results = list(iter_ndjson(io.BytesIO(body)))
+
+    assert [line_no for line_no, _ in results] == [1, 2, 3, 4]
+    assert isinstance(results[0][1], dict)
+    assert all(isinstance(item, RowError) for _, item in results[1:])
+
+
+def test_iter_csv_rejects_only_the_bad_rows():
+    big = 'x' * 200_000
+    body = (
+        b'latitude,longitude,description\n'
+        b'28.61,77.21,ok\n'
+        b'28.61,77.21,caf\xe9\n'  # Latin-1, not UTF-8
+        + f'28.61,77.21,{big}\n'.encode()
+        + b'28.61,77.21,"two\nlines"\n'
+        b'28.61,77.21,last\n'
+    )
+    results = list(iter_csv(io.BytesIO(body)))
+
+    assert [line_no for line_no, _ in results] == [2, 3, 4, 6, 7]
+    ok, bad_utf8, too_big, multiline, last = [item for _, item in results]
+    assert ok["description"] == 'ok'
+    assert 'UTF-8' in str(bad_utf8)
+    assert 'field larger than field limit' in str(too_big)
+    assert multiline["description"] == 'two\nlines'
+    assert last["description"] == 'last'
+
+
+def test_iter_csv_rejects_undecodable_header():
+    results = list(iter_csv(io.BytesIO(b'lat\xff,lng\n1,2\n')))
+    assert len(results) == 1 and isinstance(results[0][1], RowError)
+
+
+def test_import_summary_counts_rows_and_errors(monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, 'BULK_BATCH_SIZE', 2)
+
+    body = ndjson(row(), row(severity=99999999999), b'{oops', row(latitude=95), row(), row(longitude=-200))
+    summary, inserted = run_import(body)
+
+    assert summary["imported"] == 2 and len(inserted) == 2
+    assert summary["rejected"] == 4
+    assert [error["line"] for error in summary["errors"]] == [2, 3, 4, 6]
+    assert 'severity' in summary["errors"][0]["error"]
+
+
+def test_import_truncates_error_list(monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, 'BULK_MAX_ERRORS', 2)
+
+    summary, _ = run_import(ndjson(b'x', b'y', b'z', row()))
+    assert summary["rejected"] == 3
+    assert len(summary["errors"]) == 2
+    assert summary["errors_truncated"] is True
+
+
+def test_bulk_endpoint_returns_summary_for_bad_csv(client):
+    body = b'latitude,longitude,type\n12.11,70.11,theft\n12.11,70.11,\xff\n'
+    response = client.post('/api/reports/bulk', data=body, content_type='text/csv')
+
+    assert response.status_code == 200
+    assert response.json["imported"] == 1
+    assert response.json["errors"] == [{"line": 3, "error": "Invalid UTF-8"}]
@@ -0,0 +1,104 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+import caching
+from caching import DataVersions, ResponseCache, conditional_json, _negotiate_encoding
+
+LARGE = {"points": list(range(2000))}  # Above COMPRESS_MIN_SIZE
+SMALL = {"ok": True}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(caching, 'response_cache', ResponseCache())
+    app = Flask(__name__)
+    calls = []
+
+    @app.route('/large')
+    @conditional_json(lambda: 'v1-large')
+    def large():
+        calls.append('large')
+        return LARGE
+
+    @app.route('/small')
+    @conditional_json(lambda: 'v1-small')
+    def small():
+        calls.append('small')
+        return SMALL
+
+    test_client = app.test_client()
+    test_client.calls = calls
+    return test_client
+
+
+def test_gzip_variant_has_its_own_etag(client):
+    response = client.get('/large', headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == 'gzip'
+    assert response.headers["ETag"] == '"v1-large-gzip"'
+    assert 'Accept-Encoding' in response.headers["Vary"]
+    assert gzip.decompress(response.data).startswith(b'{"points":[0,1')
+
+
+def test_small_body_is_not_compressed(client):
+    response = client.get('/small', headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == '"v1-small"'
+
+
+def test_not_modified_repeats_variant_etag_and_vary(client):
+    first = client.get('/large', headers={"Accept-Encoding": "gzip"})
+    response = client.get('/large', headers={
+        "Accept-Encoding": "gzip",
+        "If-None-Match": first.headers["ETag"]
+    })
+    assert response.status_code == 304
+    assert response.headers["ETag"] == first.headers["ETag"]
+    assert 'Accept-Encoding' in response.headers["Vary"]
+    assert response.data == b''
+
+
+def test_not_modified_before_the_body_is_cached(client):
+    response = client.get('/large', headers={
+        "Accept-Encoding": "gzip",
+        "If-None-Match": '"v1-large-gzip"'
+    })
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"v1-large-gzip"'
+    assert client.calls == []
+
+
+def test_variant_for_another_encoding_is_not_a_match(client):
+    gzipped = client.get('/large', headers={"Accept-Encoding": "gzip"})
+    response = client.get('/large', headers={"If-None-Match": gzipped.headers["ETag"]})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == '"v1-large"'
+
+
+def test_stale_etag_gets_full_response(client):
+    response = client.get('/large', headers={"If-None-Match": '"v0-large", W/"other"'})
+    assert response.status_code == 200
+
+
+def test_response_cache_skips_the_view(client):
+    client.get('/large', headers={"Accept-Encoding": "gzip"})
+    client.get('/large', headers={"Accept-Encoding": "gzip"})
+    assert client.calls == ['large']
+
+
+def test_negotiate_encoding_respects_q_values():
+    assert _negotiate_encoding('gzip, deflate') == 'gzip'
+    assert _negotiate_encoding('gzip;q=0') is None
+    assert _negotiate_encoding('identity') is None
+    assert _negotiate_encoding('*') in ('br', 'gzip')
+
+
+def test_region_version_changes_only_with_nearby_mutations():
+    versions = DataVersions(cell_size=0.1)
+    before = versions.region(28.61, 77.21, 0.1)[0]
+    versions.bump(19.07, 72.87)
+    assert versions.region(28.61, 77.21, 0.1)[0] == before
+    versions.bump(28.61, 77.21)
+    assert versions.region(28.61, 77.21, 0.1)[0] > before
@@ -0,0 +1,124 @@
+import pytest
+
+from caching import DataVersions
+from changefeed import ChangeFeed
+
+DELTA = 0.1
+
+
+def point(point_id, lat=28.61, lng=77.21):
+    return {"id": point_id, "lat": lat, "lng": lng}
+
+
+@pytest.fixture
+def feed():
+    return ChangeFeed(DataVersions(cell_size=0.1), max_changes=3)
+
+
+def version(feed, lat=28.61, lng=77.21):
+    return feed.versions.region(lat, lng, DELTA)[0]
+
+
+def test_changes_since_collapses_per_point(feed):
+    feed.record('add', point(1))
+    since = version(feed)
+
+    feed.record('update', point(1))
+    feed.record('add', point(2))
+    feed.record('update', point(2))
+
+    added, updated, removed = feed.changes_since(28.61, 77.21, DELTA, since)
+    assert [p["id"] for p in added] == [2]
+    assert [p["id"] for p in updated] == [1]
+    assert removed == []
+
+
+def test_point_added_and_removed_in_window_is_not_reported(feed):
+    since = version(feed)
+    feed.record('add', point(1))
+    feed.record('remove', point(1))
+
+    assert feed.changes_since(28.61, 77.21, DELTA, since) == ([], [], [])
+
+
+def test_removal_of_known_point_is_reported(feed):
+    feed.record('add', point(1))
+    since = version(feed)
+    feed.record('update', point(1))
+    feed.record('remove', point(1))
+
+    assert feed.changes_since(28.61, 77.21, DELTA, since) == ([], [], [1])
+
+
+def test_changes_outside_region_are_ignored(feed):
+    since = version(feed)
+    feed.record('add', point(1, lat=19.07, lng=72.87))
+
+    assert feed.changes_since(28.61, 77.21, DELTA, since) == ([], [], [])
+
+
+def test_evicted_history_forces_resync(feed):
+    for point_id in range(1, 5):  # one more than max_changes
+        feed.record('add', point(point_id))
+
+    assert feed.changes_since(28.61, 77.21, DELTA, 0) is None
+    # Cursors newer than the evicted entries still work
+    added, _, _ = feed.changes_since(28.61, 77.21, DELTA, 1)
+    assert [p["id"] for p in added] == [2, 3, 4]
+
+
+def test_cursor_is_bound_to_region_and_epoch(feed):
+    cursor = feed.cursor(7, 28.61, 77.21, 5)
+
+    assert feed.parse_cursor(cursor, 28.61, 77.21, 5) == 7
+    assert feed.parse_cursor(cursor, 19.07, 72.87, 5) is None
+    assert feed.parse_cursor(cursor, 28.61, 77.21, 10) is None
+    assert feed.parse_cursor('other.' + cursor.split('.', 1)[1], 28.61, 77.21, 5) is None
+    assert feed.parse_cursor('garbage', 28.61, 77.21, 5) is None
+
+
+def post_report(client, lat, lng):
+    response = client.post('/api/report', json={"latitude": lat, "longitude": lng, "user_id": "u"})
+    assert response.status_code == 200
+
+
+def test_cursor_from_another_region_gets_full_response(client):
+    post_report(client, 19.071, 72.871)
+    post_report(client, 28.511, 77.111)
+
+    delhi = client.get('/api/heatmap?lat=28.51&lng=77.11').json
+    mumbai = client.get(f"/api/heatmap?lat=19.07&lng=72.87&since={delhi['cursor']}").json
+
+    assert mumbai["full"] is True
+    assert any(p["lat"] == 19.071 for p in mumbai["heatmap_data"])
+
+
+def test_truncated_full_response_has_no_cursor(client, monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, 'HEATMAP_MAX_POINTS', 2)
+
+    for i in range(3):
+        post_report(client, 12.91 + i * 0.01, 74.81)  # ~1km apart, separate incidents
+
+    full = client.get('/api/heatmap?lat=12.92&lng=74.81').json
+    assert full["truncated"] is True
+    assert full["cursor"] is None
+    assert len(full["heatmap_data"]) == 2
+
+
+def test_sync_snapshot_is_uncapped_and_has_cursor(client, monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, 'HEATMAP_MAX_POINTS', 2)
+
+    for i in range(3):
+        post_report(client, 13.91 + i * 0.01, 75.81)
+
+    full = client.get('/api/heatmap?lat=13.92&lng=75.81&sync=true').json
+    assert full["truncated"] is False
+    assert len(full["heatmap_data"]) == 3
+    assert full["cursor"] is not None
+
+    post_report(client, 13.95, 75.81)
+    delta = client.get(f"/api/heatmap?lat=13.92&lng=75.81&since={full['cursor']}").json
+    assert delta["full"] is False
+    assert [p["lat"] for p in delta["added"]] == [13.95]
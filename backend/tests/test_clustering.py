@@ -0,0 +1,119 @@
+import pytest
+
+from clustering import IncidentClusterer, METERS_PER_DEGREE
+
+LAT, LNG = 28.61, 77.21
+
+
+def report(report_id, minutes=0, north_m=0.0, severity=3):
+    return {
+        "id": report_id,
+        "latitude": LAT + north_m / METERS_PER_DEGREE,
+        "longitude": LNG,
+        "incident_type": "harassment",
+        "severity": severity,
+        "timestamp": f"2024-01-01T10:{minutes:02d}:00"
+    }
+
+
+@pytest.fixture
+def clusterer():
+    return IncidentClusterer(radius=100, window=30 * 60)
+
+
+def test_first_report_creates_incident(clusterer):
+    incident, created, merged = clusterer.add(report(1))
+    assert created and merged == []
+    assert incident["report_ids"] == [1]
+    assert list(clusterer.incidents) == [incident["id"]]
+
+
+def test_nearby_report_joins_incident(clusterer):
+    first, _, _ = clusterer.add(report(1, severity=2))
+    second = report(2, minutes=5, north_m=50, severity=4)
+    incident, created, _ = clusterer.add(second)
+
+    assert not created and incident is first
+    assert incident["report_count"] == 2
+    assert incident["severity"] == 4
+    assert incident["last_seen"] == second["timestamp"]
+    assert second["incident_id"] == first["id"]
+
+
+def test_distant_report_starts_new_incident(clusterer):
+    clusterer.add(report(1))
+    _, created, _ = clusterer.add(report(2, north_m=500))
+    assert created
+    assert len(clusterer.incidents) == 2
+
+
+def test_bridging_report_merges_incidents(clusterer):
+    reports = {1: report(1), 2: report(2, north_m=180)}
+    a, _, _ = clusterer.add(reports[1])
+    b, _, _ = clusterer.add(reports[2])
+    assert a is not b
+
+    reports[3] = report(3, minutes=1, north_m=90)
+    incident, created, merged = clusterer.add(reports[3], reports.get)
+
+    assert not created
+    assert incident is a and merged == [b]
+    assert list(clusterer.incidents) == [a["id"]]
+    assert sorted(incident["report_ids"]) == [1, 2, 3]
+    assert all(r["incident_id"] == a["id"] for r in reports.values())
+
+    # Later neighbours of the absorbed incident's reports find the survivor
+    incident, created, _ = clusterer.add(report(4, minutes=2, north_m=250))
+    assert incident is a and not created
+
+
+def test_reports_outside_window_are_separate(clusterer):
+    clusterer.add(report(1))
+    _, created, _ = clusterer.add(report(2, minutes=45))
+    assert created
+
+
+def test_out_of_order_reports_are_evicted(clusterer):
+    clusterer.add(report(1, minutes=40))
+    # Late report, older than the newest one but still inside the window
+    clusterer.add(report(2, minutes=20, north_m=500))
+    # Late report already outside the window is clustered but not indexed
+    clusterer.add(report(3, minutes=5, north_m=1000))
+    assert sum(len(bucket) for bucket in clusterer._grid.values()) == 2
+
+    clusterer.add(report(4, minutes=55, north_m=2000))
+    # The minute-20 entry was indexed after the minute-40 one, yet expires first
+    remaining = [entry[2] for bucket in clusterer._grid.values() for entry in bucket]
+    assert len(remaining) == 2
+    assert min(remaining) == clusterer._latest - 15 * 60
+
+
+def test_recluster_rebuilds_in_time_order(clusterer):
+    reports = [report(1, minutes=0), report(2, minutes=50, north_m=90), report(3, minutes=25, north_m=45)]
+    for r in reports:
+        clusterer.add(r)
+    assert len(clusterer.incidents) == 2
+
+    old, new = clusterer.recluster(reports)
+    assert len(old) == 2
+    # In time order report 3 bridges the other two within the window
+    assert len(new) == 1
+    assert sorted(new[0]["report_ids"]) == [1, 2, 3]
+    assert new[0]["first_seen"] == reports[0]["timestamp"]
+
+
+def test_recluster_endpoint_requires_token(client, auth_headers):
+    assert client.post('/api/incidents/recluster').status_code == 401
+    response = client.post('/api/incidents/recluster', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json["success"] is True
+
+
+def test_location_history_counts_incidents_not_reports(client):
+    app_module = pytest.importorskip('app')
+    for _ in range(3):
+        client.post('/api/report', json={"latitude": 15.301, "longitude": 74.121, "severity": 4})
+
+    history = app_module.get_location_history(15.30, 74.12)
+    assert len(history) == 1
+    assert history[0]["report_count"] == 3
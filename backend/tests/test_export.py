@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import pytest
+
+from export import ExportError, ExportFilter, memory_pages, stream_export
+
+
+def stored_report(report_id, **fields):
+    report = {
+        "id": report_id, "user_id": "user-1", "latitude": 28.61, "longitude": 77.21,
+        "incident_type": "theft", "severity": 3, "description": "",
+        "timestamp": "2024-01-01T10:00:00", "verified": False,
+        "upvotes": 0, "downvotes": 0, "status": "active", "incident_id": None
+    }
+    report.update(fields)
+    return report
+
+
+def test_arrow_export_coerces_values_to_schema():
+    pa = pytest.importorskip('pyarrow')
+    reports = [stored_report(1), stored_report(2, user_id=42, severity=4.0)]
+
+    body = b''.join(stream_export(memory_pages(reports, ExportFilter()), 'arrow'))
+    table = pa.ipc.open_stream(body).read_all()
+
+    assert table.column('user_id').to_pylist() == ['user-1', '42']
+    assert table.column('severity').to_pylist() == [3, 4]
+    assert table.column('incident_id').to_pylist() == [None, None]
+
+
+def test_mongo_query_uses_geojson_polygon_and_dates():
+    export_filter = ExportFilter.from_args('77.0,28.4,77.4,28.8', '2024-01-01', '2024-02-01T00:00:00')
+    query = export_filter.mongo_query()
+
+    geometry = query['location']['$geoWithin']['$geometry']
+    assert geometry['type'] == 'Polygon'
+    ring = geometry['coordinates'][0]
+    assert ring[0] == ring[-1] == [77.0, 28.4]
+    assert [77.4, 28.8] in ring
+    assert query['timestamp'] == {
+        '$gte': datetime(2024, 1, 1),
+        '$lt': datetime(2024, 2, 1)
+    }
+
+
+def test_invalid_timestamp_is_rejected():
+    with pytest.raises(ExportError):
+        ExportFilter.from_args(start='last tuesday')
+
+
+def read_arrow(reports, fmt='arrow'):
+    pa = pytest.importorskip('pyarrow')
+    body = b''.join(stream_export(memory_pages(reports, ExportFilter()), fmt))
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(pa.BufferReader(body))
+    return pa.ipc.open_stream(body).read_all()
+
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet'])
+def test_unexportable_rows_are_skipped_not_streamed(fmt):
+    reports = [
+        stored_report(1, upvotes=2 ** 40),
+        stored_report(2, severity=2 ** 70),
+        stored_report(3, downvotes='many'),
+        stored_report(4)
+    ]
+    table = read_arrow(reports, fmt)
+
+    assert table.column('id').to_pylist() == [1, 4]
+    assert table.column('upvotes').to_pylist() == [2 ** 40, 0]
+
+
+def test_export_endpoint_requires_token(client, auth_headers):
+    assert client.get('/api/reports/export').status_code == 401
+
+    response = client.get('/api/reports/export?type=no-such-type', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
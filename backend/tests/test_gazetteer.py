@@ -0,0 +1,84 @@
+import struct
+
+import pytest
+
+from gazetteer import HEADER, MAGIC, VERSION, Gazetteer, build_gazetteer
+
+PLACES = [
+    (28.6139, 77.2090, {"road": "Janpath", "city": "New Delhi"}, "Janpath, New Delhi"),
+    (28.6129, 77.2295, {"amenity": "India Gate", "city": "New Delhi"}, "India Gate, New Delhi"),
+    (19.0760, 72.8777, {"suburb": "Fort", "city": "मुंबई"}, "Fort, मुंबई"),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / 'gazetteer.bin')
+    assert build_gazetteer(PLACES, path) == len(PLACES)
+    gazetteer = Gazetteer(path)
+    yield gazetteer
+    gazetteer.close()
+
+
+def test_round_trip_returns_nearest_entry(index):
+    assert len(index) == 3
+    assert index.offsets.format == 'Q'
+
+    address, display_name, distance = index.nearest(28.6140, 77.2091, 250)
+    assert address == {"road": "Janpath", "city": "New Delhi"}
+    assert display_name == "Janpath, New Delhi"
+    assert distance < 20
+
+    address, display_name, _ = index.nearest(19.0761, 72.8776, 250)
+    assert display_name == "Fort, मुंबई"
+
+
+def test_max_distance_cutoff(index):
+    # India Gate is ~440 m east of this point, Janpath ~1.6 km west
+    assert index.nearest(28.6129, 77.2250, 250) is None
+    _, display_name, distance = index.nearest(28.6129, 77.2250, 1000)
+    assert display_name == "India Gate, New Delhi"
+    assert 400 < distance < 500
+
+
+def test_empty_index(tmp_path):
+    path = str(tmp_path / 'empty.bin')
+    build_gazetteer([], path)
+    gazetteer = Gazetteer(path)
+    assert gazetteer.nearest(28.61, 77.21, 250) is None
+    gazetteer.close()
+
+
+def rewrite_header(path, **fields):
+    with open(path, 'r+b') as f:
+        values = dict(zip(('magic', 'version', 'count', 'cell_size', 'blob_size'), HEADER.unpack(f.read(HEADER.size))))
+        values.update(fields)
+        f.seek(0)
+        f.write(HEADER.pack(*values.values()))
+
+
+@pytest.mark.parametrize('fields', [{"magic": b'NOPE'}, {"version": VERSION - 1}, {"count": 10 ** 6}])
+def test_mismatched_header_is_rejected(tmp_path, fields):
+    path = str(tmp_path / 'gazetteer.bin')
+    build_gazetteer(PLACES, path)
+    rewrite_header(path, **fields)
+    with pytest.raises(ValueError):
+        Gazetteer(path)
+
+
+def test_short_file_is_rejected(tmp_path):
+    path = tmp_path / 'short.bin'
+    path.write_bytes(struct.pack('<4sI', MAGIC, VERSION))
+    with pytest.raises(ValueError):
+        Gazetteer(str(path))
+
+
+def test_forward_geocode_offline_only_makes_no_requests(monkeypatch):
+    geocoding = pytest.importorskip('geocoding')
+    monkeypatch.setattr(geocoding.Config, 'GEOCODER_OFFLINE_ONLY', True)
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("network provider called")
+    monkeypatch.setattr(geocoding.requests, 'get', no_network)
+
+    assert geocoding.geocoder.forward_geocode('India Gate') is None
@@ -0,0 +1,55 @@
+import pytest
+
+import metrics
+from metrics import MetricsRegistry, SamplingProfiler
+
+
+@pytest.fixture
+def disabled(monkeypatch):
+    monkeypatch.setattr(metrics, 'registry', MetricsRegistry(enabled=False))
+
+
+def test_counters_and_histograms_skip_recording_when_disabled(disabled):
+    counter = metrics.Counter('test_total', 'test')
+    histogram = metrics.Histogram('test_seconds', 'test')
+
+    counter.inc()
+    histogram.observe(0.1)
+    with histogram.time():
+        pass
+
+    assert counter.labels().value == 0
+    assert histogram.labels().counts == [0] * (len(histogram.buckets) + 1)
+
+
+def test_histogram_time_records_when_enabled():
+    histogram = metrics.Histogram('test_seconds', 'test')
+    with histogram.time():
+        pass
+    assert sum(histogram.labels().counts) == 1
+
+
+@pytest.mark.parametrize('interval', [-1, 0, 0.0001, 'fast', True, float('nan')])
+def test_profiler_rejects_bad_intervals(interval):
+    profiler = SamplingProfiler()
+    with pytest.raises(ValueError):
+        profiler.start(interval)
+    assert not profiler.running
+
+
+def test_profiler_start_sets_interval():
+    profiler = SamplingProfiler()
+    try:
+        assert profiler.start(0.05)
+        assert profiler.interval == 0.05
+    finally:
+        profiler.stop()
+
+
+def test_profiler_endpoint_rejects_bad_interval(client, auth_headers, monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, 'PROFILER_ENABLED', True)
+
+    response = client.post('/api/profiler', json={"action": "start", "interval": -1}, headers=auth_headers)
+    assert response.status_code == 400
+    assert not metrics.profiler.running
@@ -0,0 +1,25 @@
+import pytest
+
+
+def test_ready_in_lazy_mode_before_the_model_loads(client, monkeypatch):
+    app_module = pytest.importorskip('app')
+    monkeypatch.setattr(app_module.Config, 'MODEL_LOAD_MODE', 'lazy')
+    monkeypatch.setattr(app_module.predictor, 'model', None)
+
+    response = client.get('/api/ready')
+    assert response.status_code == 200
+    assert response.json["ready"] is True
+    assert response.json["model_loaded"] is False
+
+
+def test_not_ready_until_loaded_in_background_mode(client, monkeypatch):
+    app_module = pytest.importorskip('app')
+    monkeypatch.setattr(app_module.Config, 'MODEL_LOAD_MODE', 'background')
+    monkeypatch.setattr(app_module.predictor, 'model', None)
+
+    response = client.get('/api/ready')
+    assert response.status_code == 503
+    assert response.json["ready"] is False
+
+    monkeypatch.setattr(app_module.predictor, 'model', object())
+    assert client.get('/api/ready').status_code == 200
@@ -0,0 +1,101 @@
+import io
+import os
+import time
+
+import pytest
+
+from uploads import UploadError, UploadManager
+
+
+def png_bytes():
+    Image = pytest.importorskip('PIL.Image')
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_create_rejects_bad_sizes(tmp_path):
+    manager = UploadManager(str(tmp_path))
+    for size in ('100', 0, -1, True, None):
+        with pytest.raises(UploadError):
+            manager.create(1, 'photo.png', size)
+    with pytest.raises(UploadError):
+        manager.create(1, 'script.sh', 100)
+
+
+def test_media_dir_is_resolved_against_the_app_root():
+    app_module = pytest.importorskip('app')
+    media_dir = app_module.upload_manager.media_dir
+    assert os.path.isabs(media_dir)
+    assert media_dir.startswith(app_module.app.root_path)
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    app_module = pytest.importorskip('app')
+    manager = UploadManager(str(tmp_path / 'uploads'), on_complete=app_module.attach_media)
+    monkeypatch.setattr(app_module, 'upload_manager', manager)
+    # Serving must not depend on the working directory
+    monkeypatch.chdir(tmp_path)
+    yield app_module
+    if manager._executor is not None:
+        manager._executor.shutdown()
+
+
+def upload(client, report_id, data, chunk_size):
+    response = client.post(f'/api/reports/{report_id}/media', json={"filename": "photo.png", "size": len(data)})
+    assert response.status_code == 201
+    upload_id = response.json["upload_id"]
+
+    for offset in range(0, len(data), chunk_size):
+        chunk = data[offset:offset + chunk_size]
+        response = client.patch(f'/api/uploads/{upload_id}', data=chunk,
+                                headers={"Upload-Offset": str(offset)})
+        assert response.status_code == 200
+    return upload_id
+
+
+def wait_for(client, upload_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        session = client.get(f'/api/uploads/{upload_id}').json
+        if session["status"] != 'processing':
+            return session
+        time.sleep(0.05)
+    pytest.fail("media processing did not finish")
+
+
+def test_chunked_upload_dedupe_and_serve(app_module, client):
+    data = png_bytes()
+    report_id = client.post('/api/report', json={"latitude": 28.61, "longitude": 77.21}).json["report_id"]
+
+    response = client.post(f'/api/reports/{report_id}/media', json={"filename": "photo.png", "size": len(data)})
+    upload_id = response.json["upload_id"]
+    half = len(data) // 2
+    assert client.patch(f'/api/uploads/{upload_id}', data=data[:half],
+                        headers={"Upload-Offset": "0"}).status_code == 200
+
+    # A retried or out-of-order chunk is refused with the offset to resume from
+    mismatch = client.patch(f'/api/uploads/{upload_id}', data=data[half:],
+                            headers={"Upload-Offset": "0"})
+    assert mismatch.status_code == 409
+    assert mismatch.json["offset"] == half
+
+    assert client.patch(f'/api/uploads/{upload_id}', data=data[half:],
+                        headers={"Upload-Offset": str(half)}).status_code == 200
+    first = wait_for(client, upload_id)
+    assert first["status"] == 'complete', first["error"]
+    assert len(first["media_urls"]) == 2
+    # The unstripped original is never kept
+    assert os.listdir(app_module.upload_manager.incoming_dir) == []
+
+    # Same content again is served from the already-processed media
+    second = client.get(f'/api/uploads/{upload(client, report_id, data, 1024)}').json
+    assert second["status"] == 'complete'
+    assert second["media_urls"] == first["media_urls"]
+    assert app_module.find_report(report_id)["media_urls"] == first["media_urls"]
+
+    for url in first["media_urls"]:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.data) > 0
@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+VIDEO_EXTENSIONS = {'mp4', 'mov'}
+
+
+class UploadError(Exception):
+    """Raised for invalid upload requests; carries an HTTP status code"""
+
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def allowed_file(filename):
+    """Check the extension against Config.ALLOWED_EXTENSIONS"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
+
+
+# --- Media processing (runs in worker processes) ---
+
+def _process_image(source, media_dir, digest, ext):
+    """Re-encode without EXIF/GPS metadata and generate a thumbnail"""
+    from PIL import Image, ImageOps
+
+    image_name = f"{digest}.{ext}"
+    thumb_name = f"{digest}_thumb.jpg"
+
+    with Image.open(source) as image:
+        # Apply the EXIF orientation before metadata is dropped
+        image = ImageOps.exif_transpose(image)
+        # Saving without an exif/info payload drops GPS and camera tags
+        image.info = {}
+        image.save(os.path.join(media_dir, image_name))
+
+        image.thumbnail(Config.THUMBNAIL_SIZE)
+        image.convert('RGB').save(os.path.join(media_dir, thumb_name), 'JPEG', quality=80)
+
+    return [image_name, thumb_name]
+
+
+def _process_video(source, media_dir, digest, ext):
+    """Transcode to H.264 MP4 with metadata stripped and grab a thumbnail frame"""
+    ffmpeg = shutil.which('ffmpeg')
+    video_name = f"{digest}.mp4"
+    thumb_name = f"{digest}_thumb.jpg"
+
+    if not ffmpeg:
+        # Without ffmpeg we can't strip container metadata, so keep the
+        # file private rather than publishing GPS tags.
+        raise RuntimeError("ffmpeg is required to process video uploads")
+
+    subprocess.run([
+        ffmpeg, '-y', '-loglevel', 'error', '-i', source,
+        '-map_metadata', '-1', '-c:v', 'libx264', '-preset', 'veryfast',
+        '-c:a', 'aac', '-movflags', '+faststart',
+        os.path.join(media_dir, video_name)
+    ], check=True, timeout=Config.TRANSCODE_TIMEOUT)
+
+    subprocess.run([
+        ffmpeg, '-y', '-loglevel', 'error', '-i', source,
+        '-frames:v', '1', '-vf', f"scale={Config.THUMBNAIL_SIZE[0]}:-2",
+        os.path.join(media_dir, thumb_name)
+    ], check=True, timeout=Config.TRANSCODE_TIMEOUT)
+
+    return [video_name, thumb_name]
+
+
+def process_media(source, media_dir, digest, ext):
+    """
+    Produce the public derivatives of an uploaded file.
+    Returns the list of file names written to media_dir.
+    """
+    try:
+        if ext in IMAGE_EXTENSIONS:
+            return _process_image(source, media_dir, digest, ext)
+        return _process_video(source, media_dir, digest, ext)
+    finally:
+        # Never keep the unstripped original, even if processing failed
+        os.remove(source)
+
+
+# --- Upload sessions ---
+
+class UploadSession:
+    def __init__(self, report_id, filename, size):
+        self.id = uuid.uuid4().hex
+        self.report_id = report_id
+        self.filename = filename
+        self.ext = filename.rsplit('.', 1)[1].lower()
+        self.size = size
+        self.offset = 0
+        self.status = 'uploading'  # uploading, processing, complete, failed
+        self.media_urls = []
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.last_activity = time.monotonic()
+        self.hasher = hashlib.sha256()
+        self.lock = threading.Lock()
+
+    def to_dict(self):
+        return {
+            "upload_id": self.id,
+            "report_id": self.report_id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+            "status": self.status,
+            "media_urls": self.media_urls,
+            "error": self.error
+        }
+
+
+class UploadManager:
+    """
+    Resumable, chunked uploads streamed straight to disk.
+
+    Each chunk is copied from the request stream to a partial file in
+    fixed-size blocks while a SHA-256 is updated incrementally, so memory
+    use is constant regardless of file size. Completed files are keyed by
+    content hash: a duplicate upload reuses the already-processed media.
+    """
+
+    def __init__(self, upload_folder, on_complete=None):
+        self.upload_folder = upload_folder
+        self.incoming_dir = os.path.join(upload_folder, 'incoming')
+        self.media_dir = os.path.join(upload_folder, 'media')
+        self.on_complete = on_complete
+        self.sessions = {}
+        self._processed = {}  # content hash -> media file names
+        self._pending = {}    # content hash -> [sessions waiting on processing]
+        self._lock = threading.Lock()
+        self._executor = None
+
+        os.makedirs(self.incoming_dir, exist_ok=True)
+        os.makedirs(self.media_dir, exist_ok=True)
+
+    @property
+    def executor(self):
+        # Created lazily so importing the app doesn't fork workers
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=Config.MEDIA_WORKERS)
+        return self._executor
+
+    def _part_path(self, session):
+        return os.path.join(self.incoming_dir, f"{session.id}.part")
+
+    def create(self, report_id, filename, size):
+        """Start a new upload session"""
+        if not filename or not allowed_file(filename):
+            raise UploadError("File type not allowed")
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            raise UploadError("Upload size must be a positive integer")
+        if size > Config.MAX_UPLOAD_SIZE:
+            raise UploadError("File too large", status=413)
+
+        self._expire_sessions()
+
+        session = UploadSession(report_id, filename, size)
+        open(self._part_path(session), 'wb').close()
+        self.sessions[session.id] = session
+        return session
+
+    def _expire_sessions(self):
+        """Forget sessions idle for longer than UPLOAD_SESSION_TTL"""
+        cutoff = time.monotonic() - Config.UPLOAD_SESSION_TTL
+        for upload_id, session in list(self.sessions.items()):
+            if session.last_activity >= cutoff or session.status == 'processing':
+                continue
+            if session.status == 'uploading' and os.path.exists(self._part_path(session)):
+                os.remove(self._part_path(session))
+            self.sessions.pop(upload_id, None)
+
+    def get(self, upload_id):
+        session = self.sessions.get(upload_id)
+        if session is None:
+            raise UploadError("Upload not found", status=404)
+        return session
+
+    def write_chunk(self, upload_id, offset, stream, length):
+        """
+        Append a chunk read from `stream` at `offset`.
+        Chunks must arrive in order; a client resuming after a failure
+        asks for the current offset and continues from there.
+        """
+        session = self.get(upload_id)
+
+        with session.lock:
+            if session.status != 'uploading':
+                raise UploadError("Upload already finished", status=409, offset=session.offset)
+            if offset != session.offset:
+                raise UploadError("Offset mismatch", status=409, offset=session.offset)
+            if length is None or session.offset + length > session.size:
+                raise UploadError("Chunk exceeds declared size", status=413, offset=session.offset)
+
+            session.last_activity = time.monotonic()
+            remaining = length
+            with open(self._part_path(session), 'r+b') as part:
+                part.seek(session.offset)
+                while remaining > 0:
+                    block = stream.read(min(Config.UPLOAD_BLOCK_SIZE, remaining))
+                    if not block:
+                        break
+                    part.write(block)
+                    session.hasher.update(block)
+                    session.offset += len(block)
+                    remaining -= len(block)
+                part.truncate(session.offset)
+
+            if session.offset == session.size:
+                self._finish(session)
+
+        return session
+
+    def _existing_media(self, digest, ext):
+        """Media already processed for this content hash (e.g. before a restart)"""
+        names = self._processed.get(digest)
+        if names is not None:
+            return names
+
+        main_ext = ext if ext in IMAGE_EXTENSIONS else 'mp4'
+        names = [f"{digest}.{main_ext}", f"{digest}_thumb.jpg"]
+        if all(os.path.exists(os.path.join(self.media_dir, name)) for name in names):
+            self._processed[digest] = names
+            return names
+        return None
+
+    def _finish(self, session):
+        digest = session.hasher.hexdigest()
+        session.hasher = None
+        session.status = 'processing'
+
+        with self._lock:
+            names = self._existing_media(digest, session.ext)
+            if names is None:
+                waiting = self._pending.get(digest)
+                if waiting is None:
+                    self._pending[digest] = [session]
+                else:
+                    # Same content is already being processed
+                    waiting.append(session)
+                    os.remove(self._part_path(session))
+                    return
+
+        if names is not None:
+            # Duplicate content: reuse the processed media
+            os.remove(self._part_path(session))
+            self._complete(session, names)
+            return
+
+        source = os.path.join(self.incoming_dir, f"{digest}.{session.ext}")
+        os.replace(self._part_path(session), source)
+
+        # Processing runs in a separate process; the request returns now
+        future = self.executor.submit(process_media, source, self.media_dir, digest, session.ext)
+        future.add_done_callback(lambda f: self._processed_callback(digest, f))
+
+    def _processed_callback(self, digest, future):
+        with self._lock:
+            sessions = self._pending.pop(digest, [])
+            error = future.exception()
+            if error is None:
+                self._processed[digest] = future.result()
+
+        for session in sessions:
+            if error is None:
+                self._complete(session, future.result())
+            else:
+                logger.error("Media processing failed for %s: %s", session.id, error)
+                session.status = 'failed'
+                session.error = str(error)
+
+    def _complete(self, session, names):
+        session.media_urls = [f"/uploads/media/{name}" for name in names]
+        session.status = 'complete'
+        if self.on_complete:
+            self.on_complete(session)